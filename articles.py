@@ -0,0 +1,44 @@
+class Article:
+    """
+    A fetched news article: its text (title, description and link, one per
+    line) and metadata such as {"source": url}. Has the same page_content /
+    metadata fields as a LangChain Document, so code written against either
+    works with both; use to_langchain() where a real Document is required.
+    """
+
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata if metadata is not None else {}
+
+    def __repr__(self):
+        return f"Article(page_content={self.page_content!r}, metadata={self.metadata!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return self.page_content == other.page_content and self.metadata == other.metadata
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.page_content, self.metadata
+
+    def __setstate__(self, state):
+        self.page_content, self.metadata = state
+
+    def to_langchain(self):
+        """
+        Converts to a LangChain Document. Needs langchain-core (or an older
+        langchain) installed; it is not a dependency of the app itself.
+        """
+        try:
+            from langchain_core.documents import Document
+        except ImportError:
+            from langchain.schema import Document
+        return Document(page_content=self.page_content, metadata=dict(self.metadata))
+
+    @classmethod
+    def from_langchain(cls, document):
+        return cls(document.page_content, dict(document.metadata))
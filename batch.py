@@ -0,0 +1,169 @@
+"""
+Headless batch scoring for large watchlists.
+
+Usage:
+    python batch.py watchlist.txt -o results.csv
+    python batch.py watchlist.txt -o results.parquet --chunk-size 8 --resume
+
+The watchlist is a text file with one company name per line (blank lines and
+lines starting with "#" are ignored) or a CSV with a "name" column. Results
+are written as CSV, Parquet or JSONL depending on the output extension.
+Each finished company is appended to a JSONL checkpoint, so an interrupted
+run can be continued with --resume.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+import pandas as pd
+from dotenv import load_dotenv
+
+import http_client
+from metrics import align_prices, compute_metrics, periods_per_year, technical_scores
+from pipeline import run_comparison
+from prices import DEFAULT_INTERVAL, DEFAULT_PERIOD
+from utils import NEWS_LOOKBACK_DAYS, NEWS_MAX_ARTICLES, score_companies
+
+OUTPUT_FORMATS = ("csv", "parquet", "jsonl")
+# A watchlist outruns the NewsData quota, so news requests wait for the rate
+# limit instead of failing, and the news stage has no deadline.
+NEWS_HOST = "newsdata.io"
+STAGE_TIMEOUTS = {"news": None}
+NEWS_COLUMNS = ["growth", "stable", "risk", "score", "articles"]
+METRIC_COLUMNS = ["last_close", "total_return", "volatility", "max_drawdown", "sma_short", "sma_long", "trend", "rsi"]
+
+
+def read_watchlist(path):
+    """
+    Returns the company names in a watchlist file, de-duplicated, in order.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            names = [row.get("name", "") for row in csv.DictReader(f)]
+        else:
+            names = [line for line in f if not line.lstrip().startswith("#")]
+    return list(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+
+def load_checkpoint(path):
+    """
+    Returns {company_name: row} for every company already in the checkpoint.
+    A partially written last line (from a crash mid-write) is ignored.
+    """
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows[row["name"]] = row
+    return rows
+
+
+def _plain(value):
+    # JSON-friendly: NumPy scalars to floats, NaN to None.
+    if value is None or pd.isna(value):
+        return None
+    return float(value)
+
+
+def score_chunk(names, api_key, period, interval, lookback_days, max_articles):
+    """
+    Runs the full pipeline for a chunk of companies and returns one flat
+    result row per company. Rows whose news could not be fetched have
+    status "incomplete" and no news scores, rather than scores of 0.
+    """
+    results = run_comparison(
+        names,
+        api_key,
+        period=period,
+        interval=interval,
+        lookback_days=lookback_days,
+        max_articles=max_articles,
+        stage_timeouts=STAGE_TIMEOUTS,
+    )
+    scores = score_companies({name: results[name]["summaries"] for name in names}, names)
+    prices = align_prices({results[name]["ticker"]: results[name]["prices"] for name in names})
+    summary, _ = compute_metrics(prices, periods_per_year(interval))
+    technical = technical_scores(summary)
+    rows = []
+    for name in names:
+        result = results[name]
+        ticker = result["ticker"]
+        ticker_metrics = summary.loc[ticker].to_dict() if ticker in summary.index else {}
+        news_failed = "news" in result["errors"]
+        rows.append({
+            "name": name,
+            "ticker": ticker,
+            "ticker_found": result["ticker_found"],
+            "status": "incomplete" if result["errors"] else "ok",
+            **{column: None if news_failed else scores[name][column] for column in NEWS_COLUMNS},
+            **{column: _plain(ticker_metrics.get(column)) for column in METRIC_COLUMNS},
+            "technical_score": _plain(technical.get(ticker)),
+            "errors": "; ".join(f"{stage}: {error}" for stage, error in result["errors"].items()),
+        })
+    return rows
+
+
+def write_results(rows, path, fmt):
+    frame = pd.DataFrame(rows)
+    if fmt == "csv":
+        frame.to_csv(path, index=False)
+    elif fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_json(path, orient="records", lines=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a watchlist of companies from news and prices.")
+    parser.add_argument("watchlist", help="text file (one name per line) or CSV with a 'name' column")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv, .parquet or .jsonl)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="output format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=4, help="companies processed concurrently")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="skip companies already in the checkpoint")
+    parser.add_argument("--retry-errors", action="store_true", help="with --resume, rerun companies that had errors")
+    parser.add_argument("--period", default=DEFAULT_PERIOD)
+    parser.add_argument("--interval", default=DEFAULT_INTERVAL)
+    parser.add_argument("--lookback-days", type=int, default=NEWS_LOOKBACK_DAYS)
+    parser.add_argument("--max-articles", type=int, default=NEWS_MAX_ARTICLES)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if fmt not in OUTPUT_FORMATS:
+        parser.error(f"cannot infer output format from {args.output!r}; use --format")
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.jsonl"
+
+    load_dotenv()
+    http_client.configure_host(NEWS_HOST, max_wait=float("inf"))
+    api_key = os.getenv("NEWSDATA_API_KEY")
+    names = read_watchlist(args.watchlist)
+
+    done = load_checkpoint(checkpoint_path) if args.resume else {}
+    if args.retry_errors:
+        done = {name: row for name, row in done.items() if not row.get("errors")}
+    todo = [name for name in names if name not in done]
+    print(f"{len(names)} companies, {len(names) - len(todo)} from checkpoint, {len(todo)} to score", file=sys.stderr)
+
+    mode = "a" if args.resume else "w"
+    with open(checkpoint_path, mode, encoding="utf-8") as checkpoint:
+        for start in range(0, len(todo), args.chunk_size):
+            chunk = todo[start:start + args.chunk_size]
+            for row in score_chunk(chunk, api_key, args.period, args.interval, args.lookback_days, args.max_articles):
+                done[row["name"]] = row
+                checkpoint.write(json.dumps(row) + "\n")
+            checkpoint.flush()
+            print(f"scored {min(start + args.chunk_size, len(todo))}/{len(todo)}", file=sys.stderr)
+
+    write_results([done[name] for name in names if name in done], args.output, fmt)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Offline stand-ins for the upstream services, served from the files in
+benchmarks/fixtures/:
+
+- newsdata_page*.json: two NewsData /api/1/news result pages
+- yahoo_lookup.html: a Yahoo Finance symbol lookup page
+- yahoo_lookup_trending.html: a lookup page for "HDFC" whose embedded JSON
+  carries unrelated trending and market-summary quotes (LOOKUP_CASES)
+- prices.csv: daily closes for a few base series
+
+Fixture text uses "{company}", "{slug}" and "{symbol}" placeholders, filled
+in from the request so every company gets its own articles and symbol.
+Article dates are shifted to today so the news lookback window keeps them.
+"""
+import datetime
+import os
+import re
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# (query, expected symbol) for yahoo_lookup_trending.html. A quote found only
+# in the JSON is picked only when the query names it, and a query nothing on
+# the page resembles gets no symbol.
+LOOKUP_CASES = [
+    ("HDFC Bank", "HDFCBANK.NS"),
+    ("HDFC Life", "HDFCLIFE.NS"),
+    ("HDB", "HDB"),
+    ("Nvidia", "NVDA"),
+    ("Tata Motors", None),
+]
+
+
+def _read(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def symbol_for(company_name):
+    """
+    The symbol the lookup fixture reports for a company.
+    """
+    return re.sub(r"[^A-Za-z0-9]", "", company_name).upper()[:5] or "X"
+
+
+def _fill(text, company_name):
+    slug = re.sub(r"[^a-z0-9]+", "-", company_name.lower()).strip("-")
+    return (
+        text.replace("{company}", company_name)
+        .replace("{slug}", slug)
+        .replace("{symbol}", symbol_for(company_name))
+    )
+
+
+def lookup_page(company_name):
+    """
+    The Yahoo lookup fixture as served for company_name.
+    """
+    return _fill(_read("yahoo_lookup.html"), company_name)
+
+
+def trending_lookup_page():
+    return _read("yahoo_lookup_trending.html")
+
+
+class FixtureAdapter(BaseAdapter):
+    """
+    requests transport adapter answering NewsData and Yahoo lookup URLs from
+    fixtures, after sleeping latency seconds to stand in for the network.
+    Any other URL gets a 404, so nothing leaves the machine.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        today = datetime.date.today().isoformat()
+        self._news_pages = {}
+        for cursor, name in ((None, "newsdata_page1.json"), ("1736935800000000001", "newsdata_page2.json")):
+            self._news_pages[cursor] = re.sub(r'"pubDate": "\d{4}-\d{2}-\d{2}', f'"pubDate": "{today}', _read(name))
+        self._lookup_page = _read("yahoo_lookup.html")
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlsplit(request.url)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        host = url.hostname or ""
+        if host.endswith("newsdata.io"):
+            company_name = query.get("q", "").removesuffix(" stock")
+            page = self._news_pages.get(query.get("page"))
+            if page is None:
+                return self._response(request, 422, '{"status": "error"}')
+            return self._response(request, 200, _fill(page, company_name), "application/json")
+        if host.endswith("finance.yahoo.com") and url.path.startswith("/lookup"):
+            return self._response(request, 200, _fill(self._lookup_page, query.get("s", "")), "text/html")
+        return self._response(request, 404, "")
+
+    def _response(self, request, status, body, content_type="text/plain"):
+        response = requests.Response()
+        response.status_code = status
+        response._content = body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = content_type
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def load_price_fixture():
+    return pd.read_csv(os.path.join(FIXTURE_DIR, "prices.csv"), index_col="Date", parse_dates=True)
+
+
+def fake_download(base_prices, adapter=None):
+    """
+    Returns a yf.download stand-in that builds the (Price, Ticker) frame
+    yfinance returns from the price fixture. Each ticker maps to one base
+    series by a stable hash; dates are shifted to end today. Only daily bars
+    are served, whatever the interval. Sleeps for the adapter's latency.
+    """
+    from price_store import period_to_timedelta
+
+    shifted = base_prices.copy()
+    shifted.index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=len(shifted))
+
+    def download(tickers, period=None, interval="1d", start=None, **kwargs):
+        if adapter is not None and adapter.latency:
+            time.sleep(adapter.latency)
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        if start is not None:
+            frame = shifted[shifted.index >= pd.Timestamp(start)]
+        else:
+            delta = period_to_timedelta(period) if period else None
+            frame = shifted if delta is None else shifted[shifted.index > shifted.index[-1] - delta]
+        columns = [base_prices.columns[zlib.crc32(ticker.encode()) % len(base_prices.columns)] for ticker in tickers]
+        close = frame[columns].set_axis(tickers, axis=1)
+        close.columns = pd.MultiIndex.from_product([["Close"], tickers], names=["Price", "Ticker"])
+        return close
+
+    return download
+
+
+def install(latency=0.0):
+    """
+    Routes http_client and yfinance to the fixtures for this process and
+    lifts the per-host rate limits, so runs measure this code rather than
+    the NewsData quota. Returns the FixtureAdapter; set its latency to
+    change the simulated network delay, and read its requests counter to
+    see how many calls reached "upstream".
+    """
+    import yfinance
+
+    import http_client
+
+    for host in ("newsdata.io", "finance.yahoo.com"):
+        http_client.configure_host(host, rate=1e6, burst=1e6, concurrency=64, max_wait=0)
+    adapter = FixtureAdapter(latency)
+    session = http_client._get_session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    yfinance.download = fake_download(load_price_fixture(), adapter)
+    return adapter
@@ -0,0 +1,346 @@
+"""
+Offline benchmarks for the comparison pipeline.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --users 16 --rounds 5 --latency 0.1
+    python benchmarks/run.py --write-thresholds
+
+Every upstream call is answered from benchmarks/fixtures (see fixtures.py),
+after a simulated network latency, and all caches live in a temporary
+directory. Results are compared against benchmarks/thresholds.json; the
+exit status is 1 if any threshold is exceeded, so the script can gate a
+deploy. --write-thresholds records the current results (with headroom)
+as the new baseline instead. Thresholds only apply to runs with the
+options they were recorded with; benchmarks whose options differ are
+reported but not checked. Ticker page parsing must also resolve every
+fixtures.LOOKUP_CASES query correctly, and deduplication must keep every
+distinct fixture headline, or the exit status is 1.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+# Options each benchmark's results depend on; thresholds hold for these values only.
+BENCH_PARAMS = {
+    "comparison_cold": ("rounds", "latency", "llm"),
+    "comparison_warm": ("rounds", "latency", "llm"),
+    "concurrent_users": ("users", "rounds", "latency", "llm"),
+    "concurrent_users_shared": ("users", "rounds", "latency", "llm"),
+}
+MICRO_PARAMS = ("iterations",)
+COMPANIES = [
+    "Apple", "Reliance Industries", "HDFC Bank", "D-Wave Quantum", "Microsoft", "Infosys",
+    "Tata Motors", "Nvidia", "Amazon", "Wipro", "Tesla", "Larsen Toubro",
+]
+
+# Caches must point at the scratch directory before the app modules read their settings.
+SCRATCH_DIR = tempfile.mkdtemp(prefix="stocktool-bench-")
+os.environ["TICKER_CACHE_PATH"] = os.path.join(SCRATCH_DIR, "tickers.sqlite")
+os.environ["TICKER_INDEX_PATH"] = ""
+os.environ["PRICE_STORE_DIR"] = os.path.join(SCRATCH_DIR, "prices")
+os.environ["SENTIMENT_STORE_PATH"] = os.path.join(SCRATCH_DIR, "sentiment.sqlite")
+for cache_name in ("NEWS", "SUMMARY"):
+    os.environ[f"{cache_name}_CACHE_BACKEND"] = "memory"
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+import instrumentation  # noqa: E402
+import price_store  # noqa: E402
+from dedup import Deduplicator  # noqa: E402
+from pipeline import results_cache, run_comparison, run_shared_comparison  # noqa: E402
+from summarizer import StubLLM, summary_cache  # noqa: E402
+from ticker_cache import clear_ticker_cache  # noqa: E402
+from utils import (  # noqa: E402
+    conclude_from_news,
+    get_yahoo_ticker,
+    investment_recommendation_from_news,
+    iter_news,
+    news_cache,
+    summarize_news,
+)
+from yahoo_lookup import best_symbol  # noqa: E402
+
+
+def clear_caches():
+    news_cache.clear()
+    summary_cache.clear()
+    clear_ticker_cache()
+    results_cache.clear()
+    shutil.rmtree(price_store.STORE_DIR, ignore_errors=True)
+
+
+def summarize_timings(seconds):
+    """
+    Latency stats in milliseconds for a list of durations in seconds.
+    """
+    ms = sorted(value * 1000 for value in seconds)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    return {
+        "runs": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": statistics.median(ms),
+        "p95_ms": p95,
+    }
+
+
+def time_calls(func, iterations, setup=None):
+    durations = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return summarize_timings(durations)
+
+
+def bench_comparison(rounds, cold, llm):
+    names = COMPANIES[:4]
+    clear_caches()
+    if not cold:
+        run_comparison(names, "bench-key", llm=llm)
+    return time_calls(
+        lambda: run_comparison(names, "bench-key", llm=llm),
+        rounds,
+        setup=clear_caches if cold else None,
+    )
+
+
+def bench_concurrent_users(users, rounds, llm, shared=False):
+    """
+    users threads each run rounds comparisons of 2-4 companies drawn from a
+    shared pool, like several sessions hitting one server process. With
+    shared, sessions go through the cross-session results cache as main.py
+    does.
+    """
+    compare = run_shared_comparison if shared else run_comparison
+    clear_caches()
+    durations = []
+    lock = threading.Lock()
+
+    def session(seed):
+        rng = random.Random(seed)
+        for _ in range(rounds):
+            names = rng.sample(COMPANIES, rng.randint(2, 4))
+            started = time.perf_counter()
+            compare(names, "bench-key", llm=llm)
+            with lock:
+                durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {**summarize_timings(durations), "users": users, "throughput": len(durations) / elapsed}
+
+
+def bench_micro(iterations):
+    """
+    In-process hot paths, with the simulated network latency switched off.
+    """
+    names = COMPANIES[:4]
+    docs = {name: list(iter_news(name, "bench-key", max_articles=20)) for name in names}
+    all_docs = [doc for company_docs in docs.values() for doc in company_docs]
+    all_summaries = {name: summarize_news(company_docs) for name, company_docs in docs.items()}
+    llm = StubLLM()
+    lookup_names = iter(COMPANIES * iterations)
+    lookup_page = fixtures.lookup_page("Apple")
+    return {
+        "summarize_news": time_calls(lambda: summarize_news(all_docs), iterations),
+        "summarize_news_llm": time_calls(lambda: summarize_news(all_docs, llm=llm), iterations,
+                                         setup=summary_cache.clear),
+        "conclude_from_news": time_calls(
+            lambda: [conclude_from_news(all_summaries[name], name) for name in names], iterations
+        ),
+        "investment_recommendation": time_calls(
+            lambda: investment_recommendation_from_news(all_summaries, names), iterations
+        ),
+        "ticker_lookup_parse": time_calls(lambda: get_yahoo_ticker(next(lookup_names)), iterations,
+                                          setup=clear_ticker_cache),
+        "ticker_page_parse": time_calls(lambda: best_symbol("Apple", lookup_page), iterations),
+    }
+
+
+def run_params(args):
+    return {
+        "rounds": args.rounds,
+        "users": args.users,
+        "iterations": args.iterations,
+        "latency": args.latency,
+        "llm": args.llm,
+    }
+
+
+def comparable(bench, params, baseline_params):
+    """
+    True if bench ran with the options its thresholds were recorded with.
+    """
+    return all(params.get(name) == baseline_params.get(name) for name in BENCH_PARAMS.get(bench, MICRO_PARAMS))
+
+
+def check_lookups():
+    """
+    Returns a failure for every LOOKUP_CASES query best_symbol resolves to
+    the wrong symbol.
+    """
+    page = fixtures.trending_lookup_page()
+    failures = []
+    for query, expected in fixtures.LOOKUP_CASES:
+        symbol = best_symbol(query, page)
+        if symbol != expected:
+            failures.append(f"best_symbol({query!r}) = {symbol!r}, expected {expected!r}")
+    return failures
+
+
+def check_dedup():
+    """
+    Returns a failure for every company whose deduplicated stories are not
+    exactly the distinct headlines fetched for it: different stories must
+    not merge, and no company may be listed under another's story.
+    """
+    dedup = Deduplicator()
+    fetched = {}
+    for name in COMPANIES[:4]:
+        for doc in iter_news(name, "bench-key", max_articles=20):
+            dedup.add(doc, name)
+            fetched.setdefault(name, set()).add(doc.page_content.split("\n", 1)[0])
+    failures = []
+    for name, titles in fetched.items():
+        kept = {cluster["doc"].page_content.split("\n", 1)[0] for cluster in dedup.clusters
+                if name in cluster["companies"]}
+        if kept != titles:
+            failures.append(f"dedup for {name}: lost {sorted(titles - kept)}, foreign {sorted(kept - titles)}")
+    return failures
+
+
+def check_thresholds(results, thresholds, params):
+    """
+    Returns (human-readable failures, benchmarks skipped because params
+    differ from the recorded baseline). thresholds is {"params": {...},
+    "benchmarks": {benchmark: {metric: {"max": value} and/or {"min": value}}}}.
+    """
+    failures = []
+    skipped = []
+    for bench, metrics in thresholds["benchmarks"].items():
+        if not comparable(bench, params, thresholds["params"]):
+            skipped.append(bench)
+            continue
+        for metric, bounds in metrics.items():
+            value = results.get(bench, {}).get(metric)
+            if value is None:
+                continue
+            if "max" in bounds and value > bounds["max"]:
+                failures.append(f"{bench}.{metric} = {value:.2f} > max {bounds['max']:.2f}")
+            if "min" in bounds and value < bounds["min"]:
+                failures.append(f"{bench}.{metric} = {value:.2f} < min {bounds['min']:.2f}")
+    return failures, skipped
+
+
+def baseline_thresholds(results, headroom, params):
+    """
+    Thresholds that allow each measured value to get headroom times worse,
+    recorded together with the run params.
+    """
+    thresholds = {}
+    for bench, metrics in results.items():
+        bounds = {}
+        for metric in ("p95_ms", "mean_ms"):
+            if metric in metrics:
+                bounds[metric] = {"max": round(metrics[metric] * headroom, 2)}
+        if "throughput" in metrics:
+            bounds["throughput"] = {"min": round(metrics["throughput"] / headroom, 2)}
+        thresholds[bench] = bounds
+    return {"params": params, "benchmarks": thresholds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run offline pipeline benchmarks against recorded fixtures.")
+    parser.add_argument("--rounds", type=int, default=5, help="end-to-end comparisons per benchmark")
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per microbenchmark")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated upstream latency in seconds")
+    parser.add_argument("--llm", action="store_true", help="summarize with the offline StubLLM")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--write-thresholds", action="store_true", help="record these results as the new baseline")
+    # Run-to-run noise on the fixtures is up to ~1.7x; 2x still fails a 4x slowdown.
+    parser.add_argument("--headroom", type=float, default=2.0, help="slack allowed by --write-thresholds")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    # st.* calls outside a Streamlit server only log "missing ScriptRunContext" warnings.
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    adapter = fixtures.install(args.latency)
+    llm = StubLLM() if args.llm else None
+    try:
+        results = {}
+        instrumentation.reset()
+        results["comparison_cold"] = bench_comparison(args.rounds, cold=True, llm=llm)
+        stages = instrumentation.stage_stats()
+        results["comparison_warm"] = bench_comparison(args.rounds, cold=False, llm=llm)
+        results["concurrent_users"] = bench_concurrent_users(args.users, args.rounds, llm)
+        results["concurrent_users_shared"] = bench_concurrent_users(args.users, args.rounds, llm, shared=True)
+        adapter.latency = 0.0
+        results.update(bench_micro(args.iterations))
+        wrong = check_lookups() + check_dedup()
+    finally:
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    for bench, metrics in results.items():
+        line = "  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                         for key, value in metrics.items())
+        print(f"{bench:28s} {line}")
+    print("\ncold comparison stages (mean ms):")
+    for stage, stats in sorted(stages.items()):
+        print(f"  {stage:20s} {1000 * stats['sum'] / stats['count']:9.2f}  x{stats['count']}")
+    print(f"\nupstream requests served from fixtures: {adapter.requests}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for failure in wrong:
+        print(f"WRONG {failure}")
+    if wrong:
+        return 1
+
+    if args.write_thresholds:
+        with open(args.thresholds, "w", encoding="utf-8") as f:
+            json.dump(baseline_thresholds(results, args.headroom, run_params(args)), f, indent=2)
+            f.write("\n")
+        print(f"wrote {args.thresholds}")
+        return 0
+
+    if not os.path.exists(args.thresholds):
+        print(f"no thresholds at {args.thresholds}; run with --write-thresholds to record a baseline")
+        return 0
+    with open(args.thresholds, encoding="utf-8") as f:
+        thresholds = json.load(f)
+    failures, skipped = check_thresholds(results, thresholds, run_params(args))
+    if skipped:
+        print(f"not checked (thresholds recorded with {thresholds['params']}): {', '.join(skipped)}")
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if not failures:
+        print("all checked benchmarks within thresholds" if skipped else "all benchmarks within thresholds")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import instrumentation
+
+
+def make_key(*parts):
+    """
+    Builds a stable string key from JSON-serializable parts.
+    """
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def _size_of(value):
+    # Approximate in-memory footprint: the pickled size, which tracks the
+    # payload (text, arrays) rather than Python object overhead.
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemoryBackend:
+    """
+    In-process LRU store, shared by every session of one Streamlit server
+    (the module is imported once per process) but lost on restart. Evicts
+    least recently used entries past max_entries or, if max_bytes is set,
+    past max_bytes of (approximate) stored data. A value bigger than
+    max_bytes on its own is not stored at all.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pop(self, key):
+        _, _, size = self._data.pop(key)
+        self.size -= size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at < time.time():
+                self._pop(key)
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        size = _size_of(value) if self.max_bytes else 0
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if self.max_bytes and size > self.max_bytes:
+                # Storing it would evict everything else and then itself.
+                return
+            self._data[key] = (value, time.time() + ttl, size)
+            self.size += size
+            while self._data and (
+                len(self._data) > self.max_entries or (self.max_bytes and self.size > self.max_bytes)
+            ):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class DiskBackend:
+    """
+    SQLite-backed store of pickled values, shared by every process that
+    points at the same file. Evicts least recently used rows past max_entries.
+    """
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        now = time.time()
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return False, None
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), now + ttl, now),
+            )
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache")
+
+
+class RedisBackend:
+    """
+    Store in a Redis-compatible server (Redis, Valkey, KeyDB, ...), shared by
+    every process and host pointing at it. Keys are namespaced by cache name
+    and expire server-side; memory caps and eviction follow the server's
+    maxmemory / maxmemory-policy settings. Needs the optional redis package.
+    """
+
+    def __init__(self, url, namespace):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self._key(key), pickle.dumps(value), px=max(int(ttl * 1000), 1))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        batch = []
+        for key in self.client.scan_iter(match=f"{self.namespace}:*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+
+class TieredBackend:
+    """
+    An in-process MemoryBackend in front of a shared (disk or Redis) backend.
+    Reads are served locally when possible; shared hits are copied into the
+    local tier for at most local_ttl seconds, which bounds how long another
+    process's invalidation can go unnoticed here.
+    """
+
+    def __init__(self, local, shared, local_ttl=60):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def get(self, key):
+        hit, value = self.local.get(key)
+        if hit:
+            return hit, value
+        hit, value = self.shared.get(key)
+        if hit:
+            self.local.set(key, value, self.local_ttl)
+        return hit, value
+
+    def set(self, key, value, ttl):
+        self.shared.set(key, value, ttl)
+        self.local.set(key, value, min(ttl, self.local_ttl))
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    def clear(self):
+        self.shared.clear()
+        self.local.clear()
+
+
+class TTLCache:
+    """
+    TTL cache over a pluggable backend. get_or_compute coalesces concurrent
+    misses for the same key into a single call of compute(); the other
+    callers wait for and share its result (or exception). Exceptions are
+    never cached.
+
+    ttl may be a function of the computed value returning seconds (None for
+    the cache default, 0 to hand the value to waiting callers without
+    storing it).
+    """
+
+    def __init__(self, backend, ttl, name="cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.name = name
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_compute(self, key, compute, ttl=None):
+        return self.get_or_compute_many([key], lambda keys: {key: compute()}, ttl)[key]
+
+    def get_or_compute_many(self, keys, compute_many, ttl=None):
+        """
+        Batch form of get_or_compute: returns {key: value} for every key,
+        calling compute_many(missing_keys) -> {key: value} once for the keys
+        that are neither cached nor already being computed by another
+        caller, and waiting for those that are.
+        """
+        values = {}
+        leading = {}
+        following = {}
+        for key in dict.fromkeys(keys):
+            hit, value = self.backend.get(key)
+            if hit:
+                instrumentation.incr("cache_hits", cache=self.name)
+                values[key] = value
+                continue
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = leading[key] = self._inflight[key] = Future()
+                else:
+                    following[key] = future
+
+        if leading:
+            instrumentation.incr("cache_misses", len(leading), cache=self.name)
+            try:
+                computed = compute_many(list(leading))
+                for key, future in leading.items():
+                    value = computed[key]
+                    self._store(key, value, ttl)
+                    values[key] = value
+                    future.set_result(value)
+            except BaseException as e:
+                for future in leading.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for key in leading:
+                        self._inflight.pop(key, None)
+
+        for key, future in following.items():
+            instrumentation.incr("cache_coalesced", cache=self.name)
+            values[key] = future.result()
+        return values
+
+    def _store(self, key, value, ttl):
+        if callable(ttl):
+            ttl = ttl(value)
+        if ttl is None or ttl > 0:
+            self.set(key, value, ttl)
+
+
+def make_cache(name, ttl, max_entries=512, max_bytes=0):
+    """
+    Builds a TTLCache configured from the environment:
+    {NAME}_CACHE_BACKEND ("memory", "disk" or "redis"), {NAME}_CACHE_TTL
+    (seconds), {NAME}_CACHE_MAX_ENTRIES, {NAME}_CACHE_MAX_BYTES (memory cap
+    of the in-process LRU, 0 for none), {NAME}_CACHE_PATH (disk) and
+    {NAME}_CACHE_REDIS_URL (redis, default REDIS_URL).
+
+    The shared disk and redis backends get an in-process LRU in front of
+    them with {NAME}_CACHE_LOCAL_ENTRIES entries (0 disables it), holding
+    copies for up to {NAME}_CACHE_LOCAL_TTL seconds.
+    """
+    prefix = name.upper()
+    backend_name = os.getenv(f"{prefix}_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv(f"{prefix}_CACHE_TTL", ttl))
+    max_entries = int(os.getenv(f"{prefix}_CACHE_MAX_ENTRIES", max_entries))
+    max_bytes = int(os.getenv(f"{prefix}_CACHE_MAX_BYTES", max_bytes))
+    if backend_name == "disk":
+        path = os.getenv(f"{prefix}_CACHE_PATH", os.path.join(".cache", f"{name.lower()}.sqlite"))
+        backend = DiskBackend(path, max_entries=max_entries)
+    elif backend_name == "redis":
+        url = os.getenv(f"{prefix}_CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        backend = RedisBackend(url, namespace=f"stocktool:{name.lower()}")
+    else:
+        return TTLCache(MemoryBackend(max_entries=max_entries, max_bytes=max_bytes), ttl, name=name)
+
+    local_entries = int(os.getenv(f"{prefix}_CACHE_LOCAL_ENTRIES", min(max_entries, 128)))
+    if local_entries > 0:
+        local_ttl = float(os.getenv(f"{prefix}_CACHE_LOCAL_TTL", 60))
+        local = MemoryBackend(max_entries=local_entries, max_bytes=max_bytes)
+        backend = TieredBackend(local, backend, local_ttl=local_ttl)
+    return TTLCache(backend, ttl, name=name)
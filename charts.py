@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Roughly one point per horizontal pixel of a wide Streamlit chart.
+DEFAULT_MAX_POINTS = 1000
+
+VIEWS = {
+    "price": "Closing Price (in INR/USD)",
+    "normalized": "Normalized Price (start = 100)",
+    "percent": "Change Since Start (%)",
+}
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of at
+    most threshold points of (x, y) that preserve the visual shape of the
+    series (peaks and troughs survive, flat stretches thin out).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are kept; the rest is split into equal buckets.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex.
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(prices, max_points=DEFAULT_MAX_POINTS):
+    """
+    LTTB-downsamples a price Series with a DatetimeIndex (or any numeric
+    index) to at most max_points points.
+    """
+    if len(prices) <= max_points:
+        return prices
+    index = prices.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(prices))
+    return prices.iloc[lttb_indices(x, prices.to_numpy(), max_points)]
+
+
+def transform(prices, view="price"):
+    """
+    Applies a chart view: raw prices, normalized to 100 at the first point,
+    or percent change since the first point.
+    """
+    if view == "price" or prices.empty:
+        return prices
+    first = prices.iloc[0]
+    if view == "normalized":
+        return prices / first * 100
+    return (prices / first - 1) * 100
+
+
+def to_long_frame(price_data, view="price", max_points=DEFAULT_MAX_POINTS):
+    """
+    Builds the compact (Date, Ticker, Value) frame sent to the browser:
+    one transformed, downsampled series per non-empty ticker.
+    """
+    frames = []
+    for ticker, prices in price_data.items():
+        if prices is None or prices.empty:
+            continue
+        series = downsample(transform(prices.astype("float32"), view), max_points)
+        frames.append(pd.DataFrame({"Date": series.index, "Ticker": ticker, "Value": series.to_numpy()}))
+    if not frames:
+        return pd.DataFrame(columns=["Date", "Ticker", "Value"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def price_chart(price_data, title, view="price", max_points=DEFAULT_MAX_POINTS):
+    """
+    Interactive Altair line chart (zoom/pan, hover tooltips) of price_data.
+    """
+    import altair as alt
+
+    frame = to_long_frame(price_data, view, max_points)
+    return (
+        alt.Chart(frame, title=title)
+        .mark_line()
+        .encode(
+            x=alt.X("Date:T", title="Date"),
+            y=alt.Y("Value:Q", title=VIEWS[view], scale=alt.Scale(zero=False)),
+            color=alt.Color("Ticker:N"),
+            tooltip=["Ticker:N", "Date:T", alt.Tooltip("Value:Q", format=",.2f")],
+        )
+        .interactive()
+    )
+
+
+def sentiment_price_chart(prices, sentiment, title, max_points=DEFAULT_MAX_POINTS):
+    """
+    Closing price (line, left axis) over rolling news sentiment per article
+    (bars, right axis; green positive, red negative), for one company.
+    sentiment is a utils.sentiment_history frame indexed by day.
+    """
+    import altair as alt
+
+    layers = []
+    scored = sentiment.dropna(subset=["score_per_article"])
+    if not scored.empty:
+        sentiment_frame = scored.rename_axis("Date").reset_index()
+        layers.append(
+            alt.Chart(sentiment_frame)
+            .mark_bar(opacity=0.4)
+            .encode(
+                x=alt.X("Date:T", title="Date"),
+                y=alt.Y("score_per_article:Q", title="Rolling sentiment per article"),
+                color=alt.condition("datum.score_per_article >= 0", alt.value("#2ca02c"), alt.value("#d62728")),
+                tooltip=[
+                    "Date:T",
+                    alt.Tooltip("score_per_article:Q", format="+.2f", title="Sentiment per article"),
+                    alt.Tooltip("articles:Q", title="Articles in window"),
+                ],
+            )
+        )
+    if prices is not None and not prices.empty:
+        series = downsample(prices.astype("float32"), max_points)
+        index = series.index.tz_localize(None) if getattr(series.index, "tz", None) else series.index
+        price_frame = pd.DataFrame({"Date": index, "Close": series.to_numpy()})
+        layers.append(
+            alt.Chart(price_frame)
+            .mark_line(color="#1f77b4")
+            .encode(
+                x=alt.X("Date:T", title="Date"),
+                y=alt.Y("Close:Q", title=VIEWS["price"], scale=alt.Scale(zero=False)),
+                tooltip=["Date:T", alt.Tooltip("Close:Q", format=",.2f")],
+            )
+        )
+    return alt.layer(*layers, title=title).resolve_scale(y="independent").interactive()
@@ -0,0 +1,209 @@
+import hashlib
+import re
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+# Articles whose titles and bodies each overlap at least this much (Jaccard
+# similarity of word shingles) are the same story. Compared separately, so
+# a shared boilerplate paragraph cannot merge different headlines.
+JACCARD_THRESHOLD = 0.8
+# Candidates come from the title signature: 16 bands of 4 MinHash rows, so
+# pairs above the threshold share a band with high probability and
+# unrelated titles almost never do.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Odd 64-bit constants for combining word hashes into shingle hashes.
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+# Fixed seeds keep signatures identical across runs and processes.
+_rng = np.random.default_rng(20240601)
+_PERM_XOR = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_PERM_MUL = _rng.integers(0, 2 ** 62, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_url(url):
+    """
+    Lowercases scheme/host, drops "www.", fragments, tracking parameters and
+    trailing slashes so syndicated links to one article compare equal.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")])
+    path = parts.path.rstrip("/")
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+
+def _article_text(doc):
+    # The article link is part of page_content; leave it out of text hashing.
+    text = doc.page_content
+    source = doc.metadata.get("source", "")
+    if source:
+        text = text.replace(source, " ")
+    return text
+
+
+def _title_and_body(text):
+    title, _, body = text.strip().partition("\n")
+    return title, body
+
+
+def mentions(text, company):
+    """
+    True if text names the company: its full name, or its first word when
+    that is at least four letters long ("Reliance" for "Reliance
+    Industries").
+    """
+    words = _WORD.findall(company.lower())
+    if not words:
+        return False
+    text = text.lower()
+    if re.search(r"\b" + r"\W+".join(map(re.escape, words)) + r"\b", text):
+        return True
+    return len(words[0]) >= 4 and re.search(rf"\b{re.escape(words[0])}\b", text) is not None
+
+
+def content_hash(text):
+    words = _WORD.findall(text.lower())
+    return hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _shingle_hashes(text):
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.zeros(1, dtype=np.uint64)
+    hashes = np.array([_word_hash(word) for word in words], dtype=np.uint64)
+    if len(hashes) < SHINGLE_SIZE:
+        return hashes
+    # Shingle hash: position-weighted sum of its word hashes (wrapping).
+    count = len(hashes) - SHINGLE_SIZE + 1
+    shingles = sum(hashes[i:i + count] * _MIX[i] for i in range(SHINGLE_SIZE))
+    return shingles ^ (shingles >> np.uint64(31))
+
+
+def minhash(text):
+    """
+    MinHash signature (NUM_PERM uint64 values) of the text's word shingles.
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two texts.
+    """
+    shingles = _shingle_hashes(text)
+    permuted = (shingles[None, :] ^ _PERM_XOR[:, None]) * _PERM_MUL[:, None]
+    return permuted.min(axis=1)
+
+
+def _bands(signature):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class Deduplicator:
+    """
+    Incrementally clusters articles from several companies into unique
+    stories: exact URL or content-hash matches first, then MinHash/LSH near
+    duplicates, whose title and body must both be similar. A near duplicate
+    only joins another company's story if its text names the company;
+    otherwise it starts a story of its own. Safe to share between threads.
+
+    Each cluster is a dict with "doc" (the first article seen), "companies"
+    (every company it was fetched for, in order), "size" and "summary", a
+    Future the first company's worker resolves with the story's summary.
+    """
+
+    def __init__(self, threshold=JACCARD_THRESHOLD):
+        self.threshold = threshold
+        self.clusters = []
+        self._by_url = {}
+        self._by_hash = {}
+        self._by_band = {}
+        self._lock = threading.Lock()
+
+    def _similar(self, a, b):
+        return np.count_nonzero(a == b) >= self.threshold * NUM_PERM
+
+    def _find(self, url, digest, bands, signatures):
+        """
+        Returns (cluster index or None, True if the match is exact).
+        """
+        if url and url in self._by_url:
+            return self._by_url[url], True
+        if digest in self._by_hash:
+            return self._by_hash[digest], True
+        checked = set()
+        for band in bands:
+            for index in self._by_band.get(band, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                if all(map(self._similar, self.clusters[index]["signature"], signatures)):
+                    return index, False
+        return None, False
+
+    def add(self, doc, company):
+        """
+        Adds one article fetched for company. Returns (cluster, is_new_story,
+        is_new_for_company). The caller that gets is_new_story must set the
+        cluster's "summary" future.
+        """
+        url = normalize_url(doc.metadata.get("source", ""))
+        text = _article_text(doc)
+        digest = content_hash(text)
+        title, body = _title_and_body(text)
+        signature = (minhash(title), minhash(body))
+        bands = _bands(signature[0])
+        with self._lock:
+            index, exact = self._find(url, digest, bands, signature)
+            if (index is not None and not exact and company not in self.clusters[index]["companies"]
+                    and not mentions(text, company)):
+                index = None
+            if index is None:
+                index = len(self.clusters)
+                cluster = {
+                    "doc": doc,
+                    "companies": [company],
+                    "size": 1,
+                    "signature": signature,
+                    "summary": Future(),
+                }
+                self.clusters.append(cluster)
+                is_new, is_new_for_company = True, True
+                for band in bands:
+                    self._by_band.setdefault(band, []).append(index)
+            else:
+                cluster = self.clusters[index]
+                cluster["size"] += 1
+                is_new = False
+                is_new_for_company = company not in cluster["companies"]
+                if is_new_for_company:
+                    cluster["companies"].append(company)
+            if url:
+                self._by_url.setdefault(url, index)
+            self._by_hash.setdefault(digest, index)
+        return cluster, is_new, is_new_for_company
+
+
+def deduplicate(docs_by_company):
+    """
+    Batch form: {company: [doc, ...]} -> list of clusters (see Deduplicator),
+    one per unique story, each attributed to every company it was found for.
+    """
+    dedup = Deduplicator()
+    for company, docs in docs_by_company.items():
+        for doc in docs:
+            dedup.add(doc, company)
+    return dedup.clusters
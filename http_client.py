@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+DEFAULT_TIMEOUT = 10
+
+# rate: tokens per second, burst: bucket size, concurrency: simultaneous requests.
+# NewsData's free tier allows 30 requests per 15 minutes.
+HOST_LIMITS = {
+    "newsdata.io": {"rate": 30 / 900, "burst": 10, "concurrency": 2, "max_wait": 30},
+    "finance.yahoo.com": {"rate": 2, "burst": 5, "concurrency": 4, "max_wait": 10},
+}
+DEFAULT_LIMITS = {"rate": 5, "burst": 10, "concurrency": 8, "max_wait": 10}
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait):
+        """
+        Takes one token, sleeping until one is available. Raises
+        RateLimitExceeded instead of waiting longer than max_wait seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            if wait > max_wait:
+                raise RateLimitExceeded(f"rate limit reached, next slot in {wait:.0f}s")
+            # Reserve the token now so concurrent callers queue behind us.
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+
+    def available(self):
+        """
+        Tokens that would be available now, without taking any.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.updated
+            return min(self.capacity, self.tokens + elapsed * self.rate)
+
+
+class _Host:
+    def __init__(self, limits):
+        self.bucket = TokenBucket(limits["rate"], limits["burst"])
+        self.semaphore = threading.BoundedSemaphore(limits["concurrency"])
+        self.max_wait = limits["max_wait"]
+        self.stats = {
+            "requests": 0,
+            "responses": 0,
+            "success": 0,
+            "errors": 0,
+            "retries": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+
+_session = None
+_hosts = {}
+_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _limits_for(host):
+    for suffix, limits in HOST_LIMITS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return suffix, limits
+    return host, DEFAULT_LIMITS
+
+
+def _get_host(url):
+    key, limits = _limits_for(urlsplit(url).hostname or "")
+    with _lock:
+        if key not in _hosts:
+            _hosts[key] = _Host(limits)
+        return key, _hosts[key]
+
+
+def configure_host(host, **limits):
+    """
+    Overrides rate/burst/concurrency/max_wait for a host (and its subdomains).
+    Takes effect for hosts not yet contacted in this process.
+    """
+    HOST_LIMITS[host] = {**DEFAULT_LIMITS, **HOST_LIMITS.get(host, {}), **limits}
+    with _lock:
+        _hosts.pop(host, None)
+
+
+def has_capacity(url, reserve=0):
+    """
+    True if a request to url could go out now while leaving at least reserve
+    rate-limit tokens for other callers. Lets background work use only spare
+    quota.
+    """
+    _, host = _get_host(url)
+    return host.bucket.available() >= 1 + reserve
+
+
+def _backoff(attempt, response=None):
+    if response is not None and response.status_code == 429:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_CAP)
+    # Full jitter: uniform over [0, base * 2^attempt], capped.
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _record(host, key, value):
+    with _lock:
+        host.stats[key] += value
+
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES):
+    """
+    GET through the shared keep-alive session, honouring the host's rate limit
+    and concurrency cap. Retries connection errors, timeouts and 429/5xx
+    responses with exponential backoff and jitter; the last response (or
+    exception) is returned (or raised) once retries are exhausted.
+    """
+    session = _get_session()
+    _, host = _get_host(url)
+    attempt = 0
+    while True:
+        host.bucket.acquire(host.max_wait)
+        response = None
+        started = time.monotonic()
+        try:
+            with host.semaphore:
+                response = session.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, "errors", 1)
+            if attempt >= max_retries:
+                raise
+        else:
+            elapsed = time.monotonic() - started
+            with _lock:
+                host.stats["responses"] += 1
+                host.stats["latency_total"] += elapsed
+                host.stats["latency_max"] = max(host.stats["latency_max"], elapsed)
+            if response.status_code not in RETRY_STATUSES:
+                _record(host, "success" if response.ok else "errors", 1)
+                return response
+            _record(host, "errors", 1)
+            if attempt >= max_retries:
+                return response
+        finally:
+            _record(host, "requests", 1)
+        time.sleep(_backoff(attempt, response))
+        attempt += 1
+        _record(host, "retries", 1)
+
+
+def get_stats():
+    """
+    Returns a snapshot of per-host counters: requests, responses, success,
+    errors, retries, and latency (total, max and mean seconds per response).
+    """
+    with _lock:
+        snapshot = {}
+        for key, host in _hosts.items():
+            stats = dict(host.stats)
+            responses = stats["responses"]
+            stats["latency_mean"] = stats["latency_total"] / responses if responses else 0.0
+            snapshot[key] = stats
+        return snapshot
+
+
+def reset_stats():
+    with _lock:
+        for host in _hosts.values():
+            for key in host.stats:
+                host.stats[key] = 0
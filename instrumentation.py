@@ -0,0 +1,247 @@
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Structured JSON lines for every span and counter update when enabled.
+JSON_LOGS = os.getenv("INSTRUMENTATION_JSON_LOGS", "").lower() in ("1", "true", "yes")
+MAX_SPANS = 2000
+
+logger = logging.getLogger("stocktool.instrumentation")
+if JSON_LOGS and not logger.handlers:
+    # One bare JSON object per line on stderr, whatever the root logger is set to.
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_lock = threading.Lock()
+_sequence = itertools.count(1)
+_spans = deque(maxlen=MAX_SPANS)
+_stage_stats = {}
+_counters = {}
+
+
+def _log(event, **fields):
+    if JSON_LOGS:
+        logger.info(json.dumps({"event": event, "ts": time.time(), **fields}, default=str))
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def incr(name, value=1, **labels):
+    """
+    Adds value to a counter, e.g. incr("cache_hits", cache="news").
+    """
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _log("counter", name=name, value=value, labels=labels)
+
+
+@contextmanager
+def span(stage, company=None, **fields):
+    """
+    Times a block as one pipeline stage, optionally for one company. Errors
+    are counted per stage and re-raised.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        record = {
+            "seq": next(_sequence),
+            "stage": stage,
+            "company": company,
+            "duration": duration,
+            "error": error,
+            "thread": threading.current_thread().name,
+            **fields,
+        }
+        with _lock:
+            _spans.append(record)
+            stats = _stage_stats.setdefault(stage, {"count": 0, "sum": 0.0, "max": 0.0, "errors": 0})
+            stats["count"] += 1
+            stats["sum"] += duration
+            stats["max"] = max(stats["max"], duration)
+            stats["errors"] += error is not None
+        _log("span", **record)
+
+
+def timed(stage):
+    """
+    Decorator form of span(); the company label is the first positional
+    argument when it is a string.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            company = args[0] if args and isinstance(args[0], str) else None
+            with span(stage, company):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def mark():
+    """
+    Returns a marker; spans_since(marker) lists spans recorded after it.
+    """
+    with _lock:
+        return _spans[-1]["seq"] if _spans else 0
+
+
+def spans_since(marker=0):
+    with _lock:
+        return [record for record in _spans if record["seq"] > marker]
+
+
+def stage_stats():
+    with _lock:
+        return {stage: dict(stats) for stage, stats in _stage_stats.items()}
+
+
+def counters():
+    """
+    Returns {(name, labels tuple): value}.
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _stage_stats.clear()
+        _counters.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def prometheus_text():
+    """
+    Renders stage timings, counters and per-host HTTP stats in the
+    Prometheus text exposition format.
+    """
+    import http_client
+
+    stats_by_stage = sorted(stage_stats().items())
+    lines = []
+    # Prometheus wants each metric family's samples grouped under its TYPE line.
+    families = (
+        ("stocktool_stage_seconds", "summary", (("_count", "count", "d"), ("_sum", "sum", ".6f"))),
+        ("stocktool_stage_seconds_max", "gauge", (("", "max", ".6f"),)),
+        ("stocktool_stage_errors_total", "counter", (("", "errors", "d"),)),
+    )
+    for family, kind, samples in families:
+        lines.append(f"# TYPE {family} {kind}")
+        for suffix, key, fmt in samples:
+            for stage, stats in stats_by_stage:
+                lines.append(f"{family}{suffix}{_format_labels((('stage', stage),))} {stats[key]:{fmt}}")
+    current = counters()
+    names = sorted({name for name, _ in current})
+    for name in names:
+        lines.append(f"# TYPE stocktool_{name}_total counter")
+        for (counter, labels), value in sorted(current.items()):
+            if counter == name:
+                lines.append(f"stocktool_{name}_total{_format_labels(labels)} {value}")
+    http_stats = sorted(http_client.get_stats().items())
+    for key in ("requests", "success", "errors", "retries"):
+        lines.append(f"# TYPE stocktool_http_{key}_total counter")
+        for host, stats in http_stats:
+            lines.append(f"stocktool_http_{key}_total{_format_labels((('host', host),))} {stats[key]}")
+    lines.append("# TYPE stocktool_http_latency_seconds_mean gauge")
+    for host, stats in http_stats:
+        lines.append(f"stocktool_http_latency_seconds_mean{_format_labels((('host', host),))} {stats['latency_mean']:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """
+    Writes prometheus_text() atomically, for a node-exporter textfile collector.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serves prometheus_text() at http://host:port/metrics on a daemon thread.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+@contextmanager
+def profile(enabled=True, top=30):
+    """
+    Profiles the block with cProfile (or pyinstrument, if installed and
+    PROFILER=pyinstrument). Yields a dict whose "report" key holds the text
+    report once the block exits. Only the calling thread is profiled; time
+    spent in pipeline worker threads shows up as waiting and is better read
+    from the stage spans.
+    """
+    result = {"report": ""}
+    if not enabled:
+        yield result
+        return
+    if os.getenv("PROFILER", "").lower() == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            pass
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield result
+            finally:
+                profiler.stop()
+                result["report"] = profiler.output_text(unicode=True)
+            return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        result["report"] = out.getvalue()
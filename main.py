@@ -1,168 +1,350 @@
-import streamlit as st
-import os
-import yfinance as yf
-from dotenv import load_dotenv
-
-from utils import (
-    fetch_news,
-    plot_stock_price,
-    get_yahoo_ticker,
-    summarize_news,
-    conclude_from_news,
-    investment_recommendation_from_news,
-)
-
-load_dotenv()
-
-st.set_page_config(page_title="📊 Stock News Comparison Tool", layout="wide")
-st.title("📈 Stock News Comparison Tool")
-st.markdown("Compare up to 4 stocks using today's latest news and price trends.")
-
-API_KEY = os.getenv("NEWSDATA_API_KEY")
-
-input_names = []
-for i in range(4):
-    ticker_input = st.sidebar.text_input(f"Stock {i+1} Name (e.g., HDFC Bank, D-Wave Quantum Inc)", key=f"ticker_{i}")
-    if ticker_input:
-        input_names.append(ticker_input.strip())
-
-if st.sidebar.button("🔍 Compare Stocks") and input_names:
-    # --- Ticker detection using Yahoo Finance ---
-    tickers = []
-    for name in input_names:
-        ticker = get_yahoo_ticker(name)
-        if ticker:
-            tickers.append(ticker)
-        else:
-            st.warning(f"Could not find ticker for {name}")
-            tickers.append(name.upper())  # fallback
-
-    # --- Fetch news and summarize ---
-    all_docs = []
-    all_summaries = {}
-    with st.spinner("Fetching latest news articles..."):
-        for company_name in input_names:
-            news_docs = fetch_news(company_name, API_KEY)
-            if news_docs:
-                st.success(f"✅ Fetched {len(news_docs)} articles for {company_name}")
-                summaries = summarize_news(news_docs)
-                all_summaries[company_name] = summaries
-                all_docs.extend(news_docs)
-            else:
-                st.warning(f"⚠️ No recent news found for {company_name}")
-                all_summaries[company_name] = []
-
-    # --- Show news summaries and sources ---
-    st.header("📰 News Summaries")
-    for company_name in input_names:
-        summaries = all_summaries.get(company_name, [])
-        if summaries:
-            st.markdown(f"**{company_name}:**")
-            for summary, url in summaries:
-                st.markdown(f"- {summary} [Source]({url})")
-        else:
-            st.markdown(f"- No recent news found for {company_name}")
-
-    # --- Fetch and plot stock prices ---
-    st.subheader("📉 Stock Price Graphs (7-day)")
-    price_data = {}
-    for ticker in tickers:
-        try:
-            close_prices = yf.download(ticker, period="7d", interval="1d")["Close"]
-            price_data[ticker] = close_prices
-        except Exception as e:
-            st.warning(f"Error fetching price for {ticker}: {e}")
-
-    plot_stock_price(price_data)
-    
-    # --- News-based conclusions ---
-    # st.header("📰 News-Based Conclusions")
-    # for company_name in input_names:
-    #     summaries = all_summaries.get(company_name, [])
-    #     st.markdown(conclude_from_news(summaries, company_name))
-    #     st.markdown("---")
-        
-    st.header("💡 Investment Recommendation")
-    st.markdown(investment_recommendation_from_news(all_summaries, input_names))
-
-
-# import streamlit as st
-# import os
-# import yfinance as yf
-# from dotenv import load_dotenv
-
-# from utils import (
-#     fetch_news,
-#     plot_stock_price,
-#     get_yahoo_ticker,
-#     display_news_summaries_and_sources, 
-#     conclude_from_news,
-# )
-
-# load_dotenv()
-
-# st.set_page_config(page_title="📊 Stock News Comparison Tool", layout="wide")
-# st.title("📈 Stock News Comparison Tool")
-# st.markdown("Compare up to 4 stocks using today's latest news and price trends.")
-
-# API_KEY = os.getenv("NEWSDATA_API_KEY")
-
-# input_names = []
-# for i in range(4):
-#     ticker_input = st.sidebar.text_input(f"Stock {i+1} Name (e.g., HDFC Bank, D-Wave Quantum Inc)", key=f"ticker_{i}")
-#     if ticker_input:
-#         input_names.append(ticker_input.strip())
-
-# if st.sidebar.button("🔍 Compare Stocks") and input_names:
-#     # --- Ticker detection using Yahoo Finance ---
-#     tickers = []
-#     for name in input_names:
-#         ticker = get_yahoo_ticker(name)
-#         if ticker:
-#             tickers.append(ticker)
-#         else:
-#             st.warning(f"Could not find ticker for {name}")
-#             tickers.append(name.upper())  # fallback
-
-#     # --- Fetch news and summarize ---
-#     all_docs = []
-#     all_summaries = {}
-#     with st.spinner("Fetching latest news articles..."):
-#         for company_name in input_names:
-#             news_docs = fetch_news(company_name, API_KEY)
-#             if news_docs:
-#                 st.success(f"✅ Fetched {len(news_docs)} articles for {company_name}")
-#                 summaries = display_news_summaries_and_sources(news_docs, llm=None)
-#                 all_summaries[company_name] = summaries
-#                 all_docs.extend(news_docs)
-#             else:
-#                 st.warning(f"⚠️ No recent news found for {company_name}")
-
-#     # --- Show news summaries and sources ---
-#     st.header("📰 News Summaries")
-#     for company_name in input_names:
-#         summaries = all_summaries.get(company_name, [])
-#         if summaries:
-#             st.markdown(f"**{company_name}:**")
-#             for summary, url in summaries:
-#                 st.markdown(f"- {summary} [Source]({url})")
-#         else:
-#             st.markdown(f"- No recent news found for {company_name}")
-
-#     # --- Fetch and plot stock prices ---
-#     st.subheader("📉 Stock Price Graphs (7-day)")
-#     price_data = {}
-#     for ticker in tickers:
-#         try:
-#             close_prices = yf.download(ticker, period="7d", interval="1d")["Close"]
-#             price_data[ticker] = close_prices
-#         except Exception as e:
-#             st.warning(f"Error fetching price for {ticker}: {e}")
-
-#     plot_stock_price(price_data)
-    
-#     st.header("📰 News-Based Conclusions")
-#     for company_name in input_names:
-#         summaries = all_summaries.get(company_name, [])
-#         st.markdown(conclude_from_news(summaries, company_name))
-#         st.markdown("---")
+import streamlit as st
+import os
+import datetime
+from dotenv import load_dotenv
+
+import http_client
+import instrumentation
+import price_store
+from charts import VIEWS, sentiment_price_chart
+from metrics import align_prices, compute_metrics, periods_per_year, technical_scores
+from pipeline import invalidate_shared_result, run_shared_comparison
+from prefetch import scheduler_from_env
+from prices import PERIOD_OPTIONS, INTERVAL_OPTIONS, DEFAULT_PERIOD, DEFAULT_INTERVAL, get_close_prices
+from ticker_cache import invalidate_ticker
+from utils import (
+    NEWS_LOOKBACK_DAYS,
+    NEWS_MAX_ARTICLES,
+    invalidate_news,
+    plot_stock_price,
+    sentiment_history,
+    conclude_from_news,
+    investment_recommendation_from_news,
+)
+
+load_dotenv()
+
+st.set_page_config(page_title="📊 Stock News Comparison Tool", layout="wide")
+st.title("📈 Stock News Comparison Tool")
+st.markdown("Compare up to 4 stocks using today's latest news and price trends.")
+
+API_KEY = os.getenv("NEWSDATA_API_KEY")
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_recommendation(all_summaries, input_names, technical):
+    return investment_recommendation_from_news(all_summaries, input_names, technical_scores=technical)
+
+
+@st.cache_resource
+def get_prefetcher():
+    # One background prefetch worker per server process (None unless PREFETCH_ENABLED).
+    return scheduler_from_env(API_KEY)
+
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus scrape endpoint, started once per server process when METRICS_PORT is set.
+    port = os.getenv("METRICS_PORT")
+    return instrumentation.start_metrics_server(int(port)) if port else None
+
+
+prefetcher = get_prefetcher()
+get_metrics_server()
+
+# Per-session results, so widget changes rerun the script without refetching:
+# companies keyed by (name, lookback, max articles), prices by (ticker, period, interval).
+st.session_state.setdefault("company_results", {})
+st.session_state.setdefault("price_results", {})
+st.session_state.setdefault("show_results", False)
+company_results = st.session_state["company_results"]
+price_results = st.session_state["price_results"]
+
+input_names = []
+for i in range(4):
+    ticker_input = st.sidebar.text_input(f"Stock {i+1} Name (e.g., HDFC Bank, D-Wave Quantum Inc)", key=f"ticker_{i}")
+    if ticker_input:
+        input_names.append(ticker_input.strip())
+
+period = st.sidebar.selectbox("Price period", PERIOD_OPTIONS, index=PERIOD_OPTIONS.index(DEFAULT_PERIOD))
+interval = st.sidebar.selectbox("Price interval", INTERVAL_OPTIONS, index=INTERVAL_OPTIONS.index(DEFAULT_INTERVAL))
+lookback_days = st.sidebar.number_input("News lookback (days)", min_value=1, max_value=7, value=NEWS_LOOKBACK_DAYS)
+max_articles = st.sidebar.number_input("Max articles per stock", min_value=1, max_value=50, value=NEWS_MAX_ARTICLES)
+chart_backend = st.sidebar.radio("Chart", ["altair", "matplotlib"], format_func={"altair": "Interactive", "matplotlib": "Static image"}.get, horizontal=True)
+chart_view = st.sidebar.selectbox("Chart view", list(VIEWS), format_func=lambda view: VIEWS[view])
+sentiment_window = st.sidebar.number_input("Sentiment window (days)", min_value=1, max_value=30, value=7)
+show_debug = st.sidebar.checkbox("Show debug panel", help="Per-stage timings, cache hit rates and upstream API stats")
+profile_run = st.sidebar.checkbox("Profile this run", help="Profile the next fetch and show the report in the debug panel")
+
+if st.sidebar.button("🔍 Compare Stocks") and input_names:
+    st.session_state["show_results"] = True
+
+if st.sidebar.button("🔄 Refresh data", help="Refetch tickers, news and prices for the stocks shown"):
+    for company_name in input_names:
+        invalidate_news(company_name)
+        invalidate_ticker(company_name)
+        invalidate_shared_result(company_name, period, interval, lookback_days, max_articles)
+        result = company_results.pop((company_name, lookback_days, max_articles), None)
+        if result:
+            price_results.pop((result["ticker"], period, interval), None)
+            price_store.expire(result["ticker"], interval)
+    cached_recommendation.clear()
+
+if st.session_state["show_results"] and input_names:
+    if prefetcher:
+        prefetcher.note_request(input_names)
+    status = st.container()
+    run_marker = instrumentation.mark()
+    run_profile = {"report": ""}
+
+    # --- News summaries: cached companies render at once, new ones stream in ---
+    st.header("📰 News Summaries")
+    news_slots = {}
+    for company_name in input_names:
+        news_slots[company_name] = st.container()
+        news_slots[company_name].markdown(f"**{company_name}:**")
+        cached = company_results.get((company_name, lookback_days, max_articles))
+        for summary, url in cached["summaries"] if cached else []:
+            news_slots[company_name].markdown(f"- {summary} [Source]({url})")
+
+    streamed = set()
+
+    def show_article(company_name, summary, url):
+        streamed.add(company_name)
+        news_slots[company_name].markdown(f"- {summary} [Source]({url})")
+
+    # --- Ticker detection, news and prices, only for stocks not fetched yet ---
+    # Other sessions' results from the last few minutes are reused (see pipeline.results_cache).
+    missing = [name for name in input_names if (name, lookback_days, max_articles) not in company_results]
+    if missing:
+        with st.spinner("Fetching tickers, latest news and prices..."), \
+                instrumentation.profile(enabled=profile_run) as run_profile:
+            fetched = run_shared_comparison(
+                missing,
+                API_KEY,
+                period=period,
+                interval=interval,
+                lookback_days=lookback_days,
+                max_articles=max_articles,
+                on_article=show_article,
+            )
+        # Failed stages are kept too (not retried on every rerun); use Refresh to retry.
+        for company_name, result in fetched.items():
+            company_results[(company_name, lookback_days, max_articles)] = result
+            price_results[(result["ticker"], period, interval)] = result["prices"]
+            if company_name not in streamed:
+                for summary, url in result["summaries"]:
+                    news_slots[company_name].markdown(f"- {summary} [Source]({url})")
+
+    results = {name: company_results[(name, lookback_days, max_articles)] for name in input_names}
+
+    # Prices for cached companies whose period/interval changed
+    stale = [r["ticker"] for r in results.values() if (r["ticker"], period, interval) not in price_results]
+    if stale:
+        with st.spinner("Fetching prices..."):
+            try:
+                for ticker, prices in get_close_prices(stale, period, interval).items():
+                    price_results[(ticker, period, interval)] = prices
+            except Exception as e:
+                status.warning(f"Error fetching prices: {e}")
+
+    all_docs = []
+    all_summaries = {}
+    for company_name in input_names:
+        result = results[company_name]
+        for stage, error in result["errors"].items():
+            status.warning(f"{stage.capitalize()} stage failed for {company_name}: {error}")
+        if not result["ticker_found"] and "ticker" not in result["errors"]:
+            status.warning(f"Could not find ticker for {company_name}")
+        if result["docs"]:
+            status.success(f"✅ Fetched {len(result['docs'])} articles for {company_name}")
+            all_docs.extend(result["docs"])
+        else:
+            status.warning(f"⚠️ No recent news found for {company_name}")
+            news_slots[company_name].markdown(f"- No recent news found for {company_name}")
+        all_summaries[company_name] = result["summaries"]
+
+    # --- Plot stock prices ---
+    st.subheader(f"📉 Stock Price Graphs ({period})")
+    price_data = {}
+    for company_name in input_names:
+        ticker = results[company_name]["ticker"]
+        prices = price_results.get((ticker, period, interval))
+        if prices is not None:
+            price_data[ticker] = prices
+
+    plot_stock_price(price_data, title=f"Stock Price Comparison - Last {period}", backend=chart_backend, view=chart_view)
+
+    # --- Technical metrics over the aligned price matrix ---
+    metrics_summary, correlation = compute_metrics(align_prices(price_data), periods_per_year(interval))
+    technical = {}
+    if not metrics_summary.empty:
+        st.subheader("📐 Price Metrics")
+        st.dataframe(metrics_summary.style.format({
+            "last_close": "{:,.2f}",
+            "total_return": "{:+.2%}",
+            "volatility": "{:.1%}",
+            "max_drawdown": "{:.2%}",
+            "sma_short": "{:,.2f}",
+            "sma_long": "{:,.2f}",
+            "trend": "{:+.0f}",
+            "rsi": "{:.1f}",
+        }))
+        if len(correlation) > 1:
+            st.markdown("**Return correlation**")
+            st.dataframe(correlation.style.format("{:.2f}"))
+        ticker_scores = technical_scores(metrics_summary)
+        for company_name in input_names:
+            ticker = results[company_name]["ticker"]
+            if ticker in ticker_scores.index:
+                technical[company_name] = float(ticker_scores[ticker])
+
+    # --- Stored daily news sentiment against price, over the price period ---
+    st.subheader("🧭 News Sentiment vs. Price")
+    sentiment_company = st.selectbox("Company", input_names, key="sentiment_company")
+    sentiment_prices = price_data.get(results[sentiment_company]["ticker"])
+    if sentiment_prices is not None and not sentiment_prices.empty:
+        sentiment_start = sentiment_prices.index.min().date()
+    else:
+        sentiment_start = datetime.date.today() - datetime.timedelta(days=30)
+    history = sentiment_history(sentiment_company, start=sentiment_start, window_days=sentiment_window)
+    if history["articles"].sum() == 0:
+        st.caption(f"No stored news sentiment for {sentiment_company} in this period yet; "
+                   "it builds up each time news is fetched.")
+    else:
+        st.altair_chart(
+            sentiment_price_chart(
+                sentiment_prices,
+                history,
+                f"{sentiment_company}: {sentiment_window}-day news sentiment vs. price",
+            ),
+            use_container_width=True,
+        )
+    
+    # --- News-based conclusions ---
+    # st.header("📰 News-Based Conclusions")
+    # for company_name in input_names:
+    #     summaries = all_summaries.get(company_name, [])
+    #     st.markdown(conclude_from_news(summaries, company_name))
+    #     st.markdown("---")
+        
+    st.header("💡 Investment Recommendation")
+    st.markdown(cached_recommendation(all_summaries, input_names, technical))
+
+    if os.getenv("METRICS_FILE"):
+        instrumentation.write_prometheus(os.getenv("METRICS_FILE"))
+
+    # --- Debug panel: what this run spent its time on ---
+    if show_debug:
+        with st.expander("🛠 Debug: stage timings", expanded=True):
+            spans = instrumentation.spans_since(run_marker)
+            if spans:
+                st.markdown("**Stages this run**")
+                st.dataframe(
+                    [{"stage": s["stage"], "company": s["company"], "seconds": round(s["duration"], 3),
+                      "error": s["error"], "thread": s["thread"]} for s in spans]
+                )
+            else:
+                st.caption("Everything on this run was served from session state.")
+            st.markdown("**Stage totals since start**")
+            st.dataframe(
+                [{"stage": stage, "count": stats["count"], "mean_s": round(stats["sum"] / stats["count"], 3),
+                  "max_s": round(stats["max"], 3), "errors": stats["errors"]}
+                 for stage, stats in sorted(instrumentation.stage_stats().items())]
+            )
+            st.markdown("**Counters**")
+            st.dataframe(
+                [{"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+                 for (name, labels), value in sorted(instrumentation.counters().items())]
+            )
+            st.markdown("**Upstream APIs**")
+            st.dataframe(
+                [{"host": host, **{key: round(value, 3) if isinstance(value, float) else value
+                                   for key, value in stats.items()}}
+                 for host, stats in http_client.get_stats().items()]
+            )
+            if run_profile["report"]:
+                st.markdown("**Profile**")
+                st.code(run_profile["report"], language="text")
+
+
+# import streamlit as st
+# import os
+# import yfinance as yf
+# from dotenv import load_dotenv
+
+# from utils import (
+#     fetch_news,
+#     plot_stock_price,
+#     get_yahoo_ticker,
+#     display_news_summaries_and_sources, 
+#     conclude_from_news,
+# )
+
+# load_dotenv()
+
+# st.set_page_config(page_title="📊 Stock News Comparison Tool", layout="wide")
+# st.title("📈 Stock News Comparison Tool")
+# st.markdown("Compare up to 4 stocks using today's latest news and price trends.")
+
+# API_KEY = os.getenv("NEWSDATA_API_KEY")
+
+# input_names = []
+# for i in range(4):
+#     ticker_input = st.sidebar.text_input(f"Stock {i+1} Name (e.g., HDFC Bank, D-Wave Quantum Inc)", key=f"ticker_{i}")
+#     if ticker_input:
+#         input_names.append(ticker_input.strip())
+
+# if st.sidebar.button("🔍 Compare Stocks") and input_names:
+#     # --- Ticker detection using Yahoo Finance ---
+#     tickers = []
+#     for name in input_names:
+#         ticker = get_yahoo_ticker(name)
+#         if ticker:
+#             tickers.append(ticker)
+#         else:
+#             st.warning(f"Could not find ticker for {name}")
+#             tickers.append(name.upper())  # fallback
+
+#     # --- Fetch news and summarize ---
+#     all_docs = []
+#     all_summaries = {}
+#     with st.spinner("Fetching latest news articles..."):
+#         for company_name in input_names:
+#             news_docs = fetch_news(company_name, API_KEY)
+#             if news_docs:
+#                 st.success(f"✅ Fetched {len(news_docs)} articles for {company_name}")
+#                 summaries = display_news_summaries_and_sources(news_docs, llm=None)
+#                 all_summaries[company_name] = summaries
+#                 all_docs.extend(news_docs)
+#             else:
+#                 st.warning(f"⚠️ No recent news found for {company_name}")
+
+#     # --- Show news summaries and sources ---
+#     st.header("📰 News Summaries")
+#     for company_name in input_names:
+#         summaries = all_summaries.get(company_name, [])
+#         if summaries:
+#             st.markdown(f"**{company_name}:**")
+#             for summary, url in summaries:
+#                 st.markdown(f"- {summary} [Source]({url})")
+#         else:
+#             st.markdown(f"- No recent news found for {company_name}")
+
+#     # --- Fetch and plot stock prices ---
+#     st.subheader("📉 Stock Price Graphs (7-day)")
+#     price_data = {}
+#     for ticker in tickers:
+#         try:
+#             close_prices = yf.download(ticker, period="7d", interval="1d")["Close"]
+#             price_data[ticker] = close_prices
+#         except Exception as e:
+#             st.warning(f"Error fetching price for {ticker}: {e}")
+
+#     plot_stock_price(price_data)
+    
+#     st.header("📰 News-Based Conclusions")
+#     for company_name in input_names:
+#         summaries = all_summaries.get(company_name, [])
+#         st.markdown(conclude_from_news(summaries, company_name))
+#         st.markdown("---")
@@ -0,0 +1,132 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+# Minutes in a regular session (NYSE/Nasdaq 6.5h; NSE/BSE 6.25h).
+TRADING_MINUTES = 390
+SHORT_WINDOW = 5
+LONG_WINDOW = 20
+RSI_WINDOW = 14
+
+_INTERVAL = re.compile(r"^(\d+)(m|h|d|wk|mo)$")
+
+# technical score = return + drawdown + volatility + trend + RSI terms,
+# scaled to be comparable with the news keyword counts.
+TECHNICAL_WEIGHTS = {
+    "total_return": 10.0,   # +1 per 10% gain over the period
+    "max_drawdown": 5.0,    # drawdown is negative: -1 per 20% peak-to-trough fall
+    "volatility": -2.0,     # -1 per 50% annualized volatility
+    "trend": 1.0,           # +1 above the long moving average, -1 below
+    "rsi": 1.0,             # +1 oversold (< 30), -1 overbought (> 70)
+}
+
+
+def align_prices(price_data):
+    """
+    Aligns {ticker: close Series} into one (timestamp x ticker) float matrix,
+    forward-filling gaps such as holidays on one exchange only.
+    Empty series are dropped.
+    """
+    series = {ticker: prices for ticker, prices in price_data.items() if prices is not None and not prices.empty}
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index().ffill().astype("float64")
+
+
+def _rsi(prices, window=RSI_WINDOW):
+    # Wilder's RSI: exponential averages of gains and losses, alpha = 1 / window.
+    change = prices.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    loss = (-change.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    rs = gain / loss.replace(0, np.nan)
+    rsi = 100 - 100 / (1 + rs)
+    return rsi.where(loss != 0, 100.0)
+
+
+def _pairwise_corr(returns):
+    """
+    Pearson correlation over pairwise-complete observations, like
+    DataFrame.corr(), computed with a handful of matrix products instead of
+    a Python loop over column pairs.
+    """
+    valid = returns.notna().to_numpy(dtype=np.float64)
+    x = returns.fillna(0.0).to_numpy()
+    count = valid.T @ valid
+    # sum_x[i, j]: sum of column i over rows where both i and j are present.
+    sum_x = x.T @ valid
+    sum_xx = (x * x).T @ valid
+    sum_xy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / count
+        var_x = sum_xx - sum_x ** 2 / count
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[count < 2] = np.nan
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=returns.columns, columns=returns.columns)
+
+
+def periods_per_year(interval):
+    """
+    Number of bars of a yfinance interval ("5m", "1h", "1d", "1wk", "1mo")
+    in a trading year, for annualizing volatility. Intraday bars count the
+    bars in one session, including a final partial bar.
+    """
+    match = _INTERVAL.match(interval)
+    if not match:
+        raise ValueError(f"unsupported interval: {interval!r}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "m":
+        return TRADING_DAYS * math.ceil(TRADING_MINUTES / count)
+    if unit == "h":
+        return TRADING_DAYS * math.ceil(TRADING_MINUTES / (60 * count))
+    return {"d": TRADING_DAYS, "wk": 52, "mo": 12}[unit] / count
+
+
+def compute_metrics(prices, periods_per_year=TRADING_DAYS):
+    """
+    Computes, for every column of an aligned price matrix at once: total
+    return, volatility annualized over periods_per_year bars (see
+    periods_per_year()), max drawdown, short/long moving averages,
+    trend (+1 above the long average, -1 below), RSI and the pairwise return
+    correlation. Returns (summary DataFrame indexed by ticker, correlation
+    DataFrame).
+    """
+    if prices.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    first = prices.bfill().iloc[0]
+    last = prices.iloc[-1]
+    returns = prices.pct_change(fill_method=None)
+    # Only the latest moving-average values are needed: average the tail.
+    long_ma = prices.iloc[-LONG_WINDOW:].mean()
+
+    summary = pd.DataFrame({
+        "last_close": last,
+        "total_return": last / first - 1,
+        "volatility": returns.std() * np.sqrt(periods_per_year),
+        "max_drawdown": (prices / prices.cummax() - 1).min(),
+        "sma_short": prices.iloc[-SHORT_WINDOW:].mean(),
+        "sma_long": long_ma,
+        "trend": np.sign(last - long_ma),
+        "rsi": _rsi(prices).iloc[-1],
+    })
+    return summary, _pairwise_corr(returns)
+
+
+def technical_scores(summary):
+    """
+    Blends the metrics summary into one score per ticker (see
+    TECHNICAL_WEIGHTS). Missing metrics (too few bars) contribute nothing.
+    """
+    if summary.empty:
+        return pd.Series(dtype=float)
+    rsi_signal = np.select([summary["rsi"] < 30, summary["rsi"] > 70], [1.0, -1.0], 0.0)
+    terms = pd.DataFrame({
+        "total_return": summary["total_return"],
+        "max_drawdown": summary["max_drawdown"],
+        "volatility": summary["volatility"],
+        "trend": summary["trend"],
+        "rsi": rsi_signal,
+    }, index=summary.index).fillna(0.0)
+    return terms @ pd.Series(TECHNICAL_WEIGHTS)
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError, as_completed
+
+import instrumentation
+from cache import make_cache, make_key
+from dedup import Deduplicator
+from prices import DEFAULT_INTERVAL, DEFAULT_PERIOD, get_close_prices
+from summarizer import DEFAULT_BATCH_SIZE
+from utils import NEWS_LOOKBACK_DAYS, NEWS_MAX_ARTICLES, get_yahoo_ticker, iter_news, record_sentiment, summarize_news
+
+# Seconds each stage may take, measured from the moment the stage can start.
+STAGE_TIMEOUTS = {"ticker": 15, "news": 20, "price": 30}
+
+# Per-company results shared by every session: keyed by the comparison
+# inputs and a RESULTS_CACHE_BUCKET-second time bucket (default: the news
+# cache TTL), so sessions within one bucket share one fetch.
+RESULTS_BUCKET = float(os.getenv("RESULTS_CACHE_BUCKET", 15 * 60))
+# Results with a failed or timed-out stage are kept only briefly.
+RESULTS_ERROR_TTL = 60
+results_cache = make_cache("results", ttl=RESULTS_BUCKET, max_entries=256)
+
+
+def _streamlit_thread_initializer():
+    """
+    Returns an executor initializer that attaches the current Streamlit
+    script context to worker threads, so st.* calls made inside utils
+    still render. Returns None outside a Streamlit run.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
+
+
+def _news_stage(company_name, api_key, result, stop, on_article, lookback_days, max_articles, llm, dedup,
+                batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Streams articles into result as they arrive, summarizing new stories in
+    groups of batch_size (one summarize_news call, and with an llm one
+    prompt, per group) and passing each to on_article(company_name,
+    summary, url). Stories already seen for another company (same URL,
+    same text or a near duplicate) reuse that company's summary instead of
+    being summarized again; repeats for the same company are skipped.
+    Stops early once the stop event is set (the stage timed out).
+    """
+    # (cluster, is_new_story) in arrival order, waiting for the next flush.
+    pending = []
+
+    def flush():
+        new = [cluster for cluster, is_new_story in pending if is_new_story]
+        if new:
+            summaries = summarize_news([cluster["doc"] for cluster in new], llm=llm, batch_size=batch_size)
+            for cluster, summary in zip(new, summaries):
+                cluster["summary"].set_result(summary)
+        for cluster, _ in pending:
+            try:
+                summary, url = cluster["summary"].result()
+            except CancelledError:
+                # The company that first fetched the story stopped before summarizing it.
+                instrumentation.incr("articles_skipped", reason="unsummarized")
+                continue
+            result["docs"].append(cluster["doc"])
+            result["summaries"].append((summary, url))
+            if on_article:
+                on_article(company_name, summary, url)
+        pending.clear()
+
+    news = iter_news(company_name, api_key, lookback_days=lookback_days, max_articles=max_articles)
+    try:
+        with instrumentation.span("news", company_name):
+            for doc in news:
+                if stop.is_set():
+                    break
+                cluster, is_new_story, is_new_for_company = dedup.add(doc, company_name)
+                if not is_new_for_company:
+                    instrumentation.incr("articles_skipped", reason="repeat")
+                    continue
+                if not is_new_story:
+                    instrumentation.incr("articles_skipped", reason="syndicated")
+                pending.append((cluster, is_new_story))
+                if sum(is_new for _, is_new in pending) >= batch_size:
+                    flush()
+            if not stop.is_set():
+                flush()
+    finally:
+        # Never leave other companies waiting on a story this one will not summarize.
+        for cluster, is_new_story in pending:
+            if is_new_story:
+                cluster["summary"].cancel()
+
+
+def _collect(futures, started, timeouts, results, stage, on_done):
+    """
+    Waits for futures (mapping future -> company name) until timeouts[stage]
+    seconds after started (forever if it is None), calling on_done(name,
+    value) for each finished one. Failures and timeouts are recorded in the
+    company's "errors" dict instead of raised.
+    """
+    pending = dict(futures)
+    limit = timeouts[stage]
+    remaining = None if limit is None else max(started + limit - time.monotonic(), 0)
+    try:
+        for future in as_completed(futures, timeout=remaining):
+            name = pending.pop(future)
+            try:
+                on_done(name, future.result())
+            except Exception as e:
+                results[name]["errors"][stage] = str(e)
+    except TimeoutError:
+        for name in pending.values():
+            results[name]["errors"][stage] = f"timed out after {limit}s"
+        instrumentation.incr("stage_timeouts", len(pending), stage=stage)
+
+
+def run_comparison(input_names, api_key, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL,
+                   lookback_days=NEWS_LOOKBACK_DAYS, max_articles=NEWS_MAX_ARTICLES,
+                   on_article=None, llm=None, max_workers=None, stage_timeouts=None):
+    """
+    Runs ticker resolution and news fetch/summary for every company
+    concurrently, then downloads prices for all resolved tickers in a single
+    batched request. Each stage is bounded by STAGE_TIMEOUTS, with
+    stage_timeouts overriding individual stages (None: wait for the stage to
+    finish); slow or failing stages leave partial results and an entry in
+    the company's "errors" dict.
+    Articles stream through on_article(company_name, summary, url) as soon
+    as they are summarized (by llm if given), before the rest of the fetch
+    finishes.
+
+    Syndicated stories are summarized once and listed under every company
+    they were fetched for. New articles are added to each company's
+    persisted daily sentiment (see utils.record_sentiment).
+
+    Returns {company_name: {"ticker", "ticker_found", "docs", "summaries",
+    "prices", "errors"}}.
+    """
+    results = {
+        name: {
+            "ticker": name.upper(),
+            "ticker_found": False,
+            "docs": [],
+            "summaries": [],
+            "prices": None,
+            "errors": {},
+        }
+        for name in input_names
+    }
+    if not input_names:
+        return results
+
+    with instrumentation.span("comparison", companies=len(input_names)):
+        _run_stages(results, input_names, api_key, period, interval, lookback_days, max_articles,
+                    on_article, llm, max_workers, {**STAGE_TIMEOUTS, **(stage_timeouts or {})})
+    # Detach from lists a timed-out news worker may still be appending to.
+    for name, result in results.items():
+        result["docs"] = list(result["docs"])
+        result["summaries"] = list(result["summaries"])
+        try:
+            record_sentiment(name, result["docs"], result["summaries"])
+        except Exception as e:
+            result["errors"]["sentiment"] = str(e)
+    return results
+
+
+def _run_stages(results, input_names, api_key, period, interval, lookback_days, max_articles,
+                on_article, llm, max_workers, timeouts):
+    """
+    The staged fan-out behind run_comparison; fills results in place.
+    """
+    started = time.monotonic()
+    stop_news = threading.Event()
+    dedup = Deduplicator()
+    pool = ThreadPoolExecutor(
+        max_workers=max_workers or 2 * len(input_names) + 1,
+        initializer=_streamlit_thread_initializer(),
+    )
+    try:
+        ticker_futures = {pool.submit(get_yahoo_ticker, name): name for name in input_names}
+        news_futures = {
+            pool.submit(
+                _news_stage,
+                name,
+                api_key,
+                results[name],
+                stop_news,
+                on_article,
+                lookback_days,
+                max_articles,
+                llm,
+                dedup,
+            ): name
+            for name in input_names
+        }
+
+        def on_ticker(name, ticker):
+            if ticker:
+                results[name]["ticker"] = ticker
+                results[name]["ticker_found"] = True
+
+        # Companies whose lookup failed or timed out keep the fallback symbol.
+        _collect(ticker_futures, started, timeouts, results, "ticker", on_ticker)
+
+        tickers = [results[name]["ticker"] for name in input_names]
+        price_future = pool.submit(instrumentation.timed("price_batch")(get_close_prices), tickers, period, interval)
+        price_started = time.monotonic()
+        price_limit = timeouts["price"]
+
+        _collect(news_futures, started, timeouts, results, "news", lambda name, _: None)
+        stop_news.set()
+
+        try:
+            remaining = None if price_limit is None else max(price_started + price_limit - time.monotonic(), 0)
+            price_data = price_future.result(timeout=remaining)
+            for name in input_names:
+                results[name]["prices"] = price_data.get(results[name]["ticker"])
+        except TimeoutError:
+            for name in input_names:
+                results[name]["errors"]["price"] = f"timed out after {price_limit}s"
+            instrumentation.incr("stage_timeouts", stage="price")
+        except Exception as e:
+            for name in input_names:
+                results[name]["errors"]["price"] = str(e)
+    finally:
+        stop_news.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _result_key(name, period, interval, lookback_days, max_articles, bucket=None):
+    if bucket is None:
+        bucket = int(time.time() // RESULTS_BUCKET)
+    return make_key(name, period, interval, lookback_days, max_articles, bucket)
+
+
+def run_shared_comparison(input_names, api_key, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL,
+                          lookback_days=NEWS_LOOKBACK_DAYS, max_articles=NEWS_MAX_ARTICLES,
+                          on_article=None, llm=None, max_workers=None):
+    """
+    run_comparison through the cross-session results_cache. Companies
+    another session fetched in the current time bucket are returned from the
+    cache; companies another session is fetching right now are waited for
+    rather than fetched again; the rest go through one run_comparison call
+    (and only those stream through on_article).
+    """
+    keys = {_result_key(name, period, interval, lookback_days, max_articles): name for name in input_names}
+
+    def compute(missing_keys):
+        fetched = run_comparison(
+            [keys[key] for key in missing_keys],
+            api_key,
+            period=period,
+            interval=interval,
+            lookback_days=lookback_days,
+            max_articles=max_articles,
+            on_article=on_article,
+            llm=llm,
+            max_workers=max_workers,
+        )
+        return {key: fetched[keys[key]] for key in missing_keys}
+
+    cached = results_cache.get_or_compute_many(
+        list(keys),
+        compute,
+        ttl=lambda result: RESULTS_ERROR_TTL if result["errors"] else None,
+    )
+    return {name: cached[key] for key, name in keys.items()}
+
+
+def invalidate_shared_result(name, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL,
+                             lookback_days=NEWS_LOOKBACK_DAYS, max_articles=NEWS_MAX_ARTICLES):
+    """
+    Drops a company's shared result for the current time bucket.
+    """
+    results_cache.invalidate(_result_key(name, period, interval, lookback_days, max_articles))
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from http_client import has_capacity
+from prices import DEFAULT_INTERVAL, DEFAULT_PERIOD, get_close_prices
+from utils import (
+    NEWS_LOOKBACK_DAYS,
+    NEWS_MAX_ARTICLES,
+    NEWS_URL,
+    get_yahoo_ticker,
+    record_sentiment,
+    refresh_news,
+    summarize_news,
+)
+
+# Matches the default news cache TTL, so each cycle refreshes entries as they expire.
+PREFETCH_INTERVAL = 15 * 60
+MAX_RECENT = 20
+# NewsData tokens always left for interactive comparisons.
+QUOTA_RESERVE = 5
+
+logger = logging.getLogger("stocktool.prefetch")
+
+
+class PrefetchScheduler:
+    """
+    Background worker that keeps the ticker cache, news cache and price store
+    warm for a fixed watchlist plus the most recently requested companies.
+
+    Every interval seconds it resolves tickers, refetches today's news and
+    updates stored prices for those companies, writing into the same caches
+    fetch_news and get_close_prices read from, and adds new articles to the
+    sentiment history. News refreshes only use
+    spare NewsData quota: a company is skipped for the cycle when fewer
+    than QUOTA_RESERVE rate-limit tokens would remain. A failed news
+    refresh keeps the cached page and is logged and counted in
+    prefetch_errors.
+    """
+
+    def __init__(self, api_key, watchlist=(), interval=PREFETCH_INTERVAL, max_recent=MAX_RECENT,
+                 max_workers=2, period=DEFAULT_PERIOD, price_interval=DEFAULT_INTERVAL,
+                 lookback_days=NEWS_LOOKBACK_DAYS, max_articles=NEWS_MAX_ARTICLES):
+        self.api_key = api_key
+        self.watchlist = list(dict.fromkeys(watchlist))
+        self.interval = interval
+        self.max_recent = max_recent
+        self.max_workers = max_workers
+        self.period = period
+        self.price_interval = price_interval
+        self.lookback_days = lookback_days
+        self.max_articles = max_articles
+        self.last_run = None
+        self.last_skipped = []
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def note_request(self, names):
+        """
+        Records companies a user just compared, so later cycles keep them warm.
+        """
+        with self._lock:
+            for name in names:
+                self._recent.pop(name, None)
+                self._recent[name] = time.time()
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    def companies(self):
+        with self._lock:
+            recent = list(reversed(self._recent))
+        return list(dict.fromkeys(self.watchlist + recent))
+
+    def _refresh_news(self, name):
+        if not has_capacity(NEWS_URL, reserve=QUOTA_RESERVE):
+            return False
+        try:
+            docs = refresh_news(name, self.api_key, lookback_days=self.lookback_days, max_articles=self.max_articles)
+        except Exception:
+            instrumentation.incr("prefetch_errors", stage="news")
+            logger.exception("prefetch: news refresh failed for %s", name)
+            return False
+        try:
+            # Summarized as the app does (no LLM), so both record the same counts.
+            record_sentiment(name, docs, summarize_news(docs))
+        except Exception:
+            instrumentation.incr("prefetch_errors", stage="sentiment")
+            logger.exception("prefetch: sentiment update failed for %s", name)
+        return True
+
+    def run_once(self):
+        """
+        Runs one refresh cycle and returns {"companies", "news_skipped"};
+        news_skipped lists companies whose news was not refreshed, for lack
+        of quota or because the fetch failed.
+        """
+        names = self.companies()
+        if not names:
+            return {"companies": [], "news_skipped": []}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            tickers = [ticker for ticker in pool.map(get_yahoo_ticker, names) if ticker]
+            refreshed = list(pool.map(self._refresh_news, names))
+        if tickers:
+            try:
+                get_close_prices(tickers, self.period, self.price_interval)
+            except Exception:
+                instrumentation.incr("prefetch_errors", stage="price")
+                logger.exception("prefetch: price refresh failed")
+        skipped = [name for name, done in zip(names, refreshed) if not done]
+        self.last_run = time.time()
+        self.last_skipped = skipped
+        return {"companies": names, "news_skipped": skipped}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                instrumentation.incr("prefetch_errors", stage="cycle")
+                logger.exception("prefetch: cycle failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def read_watchlist_env():
+    """
+    Companies from PREFETCH_WATCHLIST (comma-separated) and/or
+    PREFETCH_WATCHLIST_FILE (one name per line, "#" comments allowed).
+    """
+    names = [name.strip() for name in os.getenv("PREFETCH_WATCHLIST", "").split(",")]
+    path = os.getenv("PREFETCH_WATCHLIST_FILE", "")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            names += [line.strip() for line in f if not line.lstrip().startswith("#")]
+    return [name for name in dict.fromkeys(names) if name]
+
+
+def scheduler_from_env(api_key):
+    """
+    Starts a PrefetchScheduler if PREFETCH_ENABLED is set ("1", "true", "yes"),
+    configured from PREFETCH_WATCHLIST(_FILE) and PREFETCH_INTERVAL seconds.
+    Returns None when prefetching is disabled.
+    """
+    if os.getenv("PREFETCH_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return None
+    interval = float(os.getenv("PREFETCH_INTERVAL", PREFETCH_INTERVAL))
+    return PrefetchScheduler(api_key, read_watchlist_env(), interval=interval).start()
@@ -0,0 +1,133 @@
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+
+STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(".cache", "prices"))
+# Stored series younger than this are served without asking Yahoo for new bars.
+MAX_AGE = float(os.getenv("PRICE_STORE_MAX_AGE", 15 * 60))
+# The first stored bar may fall a few days after the requested start
+# (weekends, holidays) and still count as covering it.
+COVERAGE_SLACK = pd.Timedelta(days=5)
+
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+
+def period_to_timedelta(period):
+    """
+    Converts a yfinance period ("7d", "3mo", "1y", ...) to a Timedelta, or
+    None for periods the store cannot express ("max", "ytd").
+    """
+    match = _PERIOD.match(period)
+    if not match:
+        return None
+    return pd.Timedelta(days=int(match.group(1)) * _PERIOD_DAYS[match.group(2)])
+
+
+def _path(ticker, interval):
+    safe = re.sub(r"[^\w.^=-]", "_", ticker)
+    return os.path.join(STORE_DIR, interval, f"{safe}.parquet")
+
+
+def read(ticker, interval):
+    """
+    Returns the stored close Series for a ticker (empty if none). The file
+    is memory-mapped while it is read, which saves a copy of the raw bytes;
+    each caller still gets its own decoded Series.
+    """
+    path = _path(ticker, interval)
+    if not os.path.exists(path):
+        return pd.Series(dtype=float, name=ticker)
+    prices = pd.read_parquet(path, memory_map=True)["Close"]
+    prices.name = ticker
+    return prices
+
+
+def age(ticker, interval):
+    """
+    Seconds since the ticker's series was last written, or None if absent.
+    """
+    path = _path(ticker, interval)
+    return time.time() - os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def expire(ticker, interval):
+    """
+    Marks the ticker's stored series as stale, so the next plan_fetch
+    refetches its latest bars. The stored history is kept.
+    """
+    path = _path(ticker, interval)
+    if os.path.exists(path):
+        os.utime(path, (0, 0))
+
+
+def append(ticker, interval, prices):
+    """
+    Merges new bars into the stored series (new values win for timestamps
+    already stored, since the latest bar may have been partial) and writes
+    it atomically. Returns the merged series.
+    """
+    stored = read(ticker, interval)
+    if not stored.empty and not prices.empty:
+        merged = pd.concat([stored, prices])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    else:
+        merged = prices if not prices.empty else stored
+    if merged.empty:
+        return merged
+    path = _path(ticker, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A temp file per call: other threads may be writing the same ticker.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        merged.rename("Close").to_frame().to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return merged
+
+
+def _as_index_time(index, timestamp):
+    # Daily bars are tz-naive, intraday bars carry the exchange timezone.
+    if index.tz is not None:
+        return timestamp.tz_localize("UTC").tz_convert(index.tz)
+    return timestamp
+
+
+def plan_fetch(tickers, period, interval, now=None):
+    """
+    Decides what to download. Returns (fetch_from, cached): fetch_from maps
+    ticker -> start Timestamp of the missing range, cached maps ticker ->
+    stored Series that is already complete and fresh.
+    """
+    now = now or pd.Timestamp.now("UTC").tz_localize(None)
+    start = now - period_to_timedelta(period)
+    fetch_from = {}
+    cached = {}
+    for ticker in tickers:
+        stored = read(ticker, interval)
+        if stored.empty or stored.index[0] > _as_index_time(stored.index, start + COVERAGE_SLACK):
+            fetch_from[ticker] = start
+        elif age(ticker, interval) > MAX_AGE:
+            # Refetch from the last stored bar, which may have been incomplete.
+            last = stored.index[-1]
+            fetch_from[ticker] = (last.tz_convert("UTC").tz_localize(None) if last.tz is not None else last)
+        else:
+            cached[ticker] = stored
+    return fetch_from, cached
+
+
+def window(prices, period, now=None):
+    """
+    Slices a stored series down to the requested period.
+    """
+    if prices.empty:
+        return prices
+    now = now or pd.Timestamp.now("UTC").tz_localize(None)
+    start = _as_index_time(prices.index, now - period_to_timedelta(period))
+    return prices[prices.index >= start.normalize()]
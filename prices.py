@@ -0,0 +1,86 @@
+import pandas as pd
+
+import instrumentation
+import price_store
+
+DEFAULT_PERIOD = "7d"
+DEFAULT_INTERVAL = "1d"
+
+PERIOD_OPTIONS = ["5d", "7d", "1mo", "3mo", "6mo", "1y", "2y", "5y"]
+INTERVAL_OPTIONS = ["1d", "1h", "30m", "15m", "5m", "1wk"]
+
+
+def split_close_prices(frame, tickers):
+    """
+    Splits a yf.download frame into {ticker: close Series}.
+    Handles both the (Price, Ticker) MultiIndex layout and the flat layout
+    older yfinance versions return for a single ticker. Tickers missing from
+    the frame, or with no valid rows, map to an empty Series.
+    """
+    if frame is None or frame.empty:
+        close = pd.DataFrame()
+    elif isinstance(frame.columns, pd.MultiIndex):
+        close = frame["Close"]
+    else:
+        close = frame[["Close"]].rename(columns={"Close": tickers[0]})
+
+    price_data = {}
+    for ticker in tickers:
+        column = ticker if ticker in close.columns else ticker.upper()
+        if column in close.columns:
+            prices = close[column].dropna()
+        else:
+            prices = pd.Series(dtype=float)
+        prices.name = ticker
+        price_data[ticker] = prices
+    return price_data
+
+
+def _yf_download(tickers, **kwargs):
+    # yfinance is imported on first download, keeping it off the app's startup path.
+    import yfinance as yf
+
+    with instrumentation.span("price_download", tickers=len(tickers)):
+        return yf.download(tickers, group_by="column", progress=False, **kwargs)
+
+
+def download_close_prices(tickers, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL):
+    """
+    Downloads closing prices for all tickers in one multi-ticker request.
+    Returns {ticker: close Series}, ready for plot_stock_price.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    frame = _yf_download(tickers, period=period, interval=interval)
+    return split_close_prices(frame, tickers)
+
+
+def get_close_prices(tickers, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL):
+    """
+    Like download_close_prices, but served from the local price store where
+    possible: only tickers with missing or stale bars are downloaded, from
+    their last stored bar onwards, in one request per distinct start date.
+    Falls back to a plain download when the store is disabled
+    (PRICE_STORE_DIR="") or the period has no fixed length ("max", "ytd").
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    if not price_store.STORE_DIR or price_store.period_to_timedelta(period) is None:
+        return download_close_prices(tickers, period, interval)
+
+    fetch_from, cached = price_store.plan_fetch(tickers, period, interval)
+    instrumentation.incr("price_store_hits", len(tickers) - len(fetch_from))
+    instrumentation.incr("price_store_misses", len(fetch_from))
+    price_data = {ticker: price_store.window(prices, period) for ticker, prices in cached.items()}
+
+    groups = {}
+    for ticker, start in fetch_from.items():
+        groups.setdefault(start.date().isoformat(), []).append(ticker)
+    for start, group in groups.items():
+        frame = _yf_download(group, start=start, interval=interval)
+        for ticker, fresh in split_close_prices(frame, group).items():
+            merged = price_store.append(ticker, interval, fresh)
+            price_data[ticker] = price_store.window(merged, period)
+    return {ticker: price_data[ticker] for ticker in tickers}
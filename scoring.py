@@ -0,0 +1,67 @@
+import re
+
+import numpy as np
+
+
+class KeywordScorer:
+    """
+    Counts keyword hits per category with one precompiled regex over every
+    keyword list. Matches whole words (and multi-word phrases) only, so
+    "up" does not match "support" and "cut" does not match "execute".
+    """
+
+    def __init__(self, categories, inflections=None):
+        """
+        categories: {category name: [keyword, ...]}. Keywords are matched
+        case-insensitively and exactly; a keyword may belong to several
+        categories. inflections: {keyword: [form, ...]} lists other forms
+        that count as the keyword ("gain": ["gains", "gained"]).
+        """
+        inflections = inflections or {}
+        self.categories = list(categories)
+        self._keyword_categories = {}
+        for column, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                for form in [keyword, *inflections.get(keyword, ())]:
+                    self._keyword_categories.setdefault(form.lower(), []).append(column)
+
+        # Longest first so phrases win over their own leading words.
+        keywords = sorted(self._keyword_categories, key=len, reverse=True)
+        alternation = "|".join(re.escape(keyword).replace(r"\ ", r"\s+") for keyword in keywords)
+        self._pattern = re.compile(rf"(?<!\w)({alternation})(?!\w)", re.IGNORECASE)
+
+    def _columns(self, match):
+        keyword = " ".join(match.group(1).lower().split())
+        return self._keyword_categories[keyword]
+
+    def count_matrix(self, texts):
+        """
+        Returns an int array of shape (len(texts), len(categories)) with the
+        number of keyword hits of each category in each text.
+        """
+        rows = []
+        columns = []
+        for row, text in enumerate(texts):
+            for match in self._pattern.finditer(text):
+                for column in self._columns(match):
+                    rows.append(row)
+                    columns.append(column)
+        counts = np.zeros((len(texts), len(self.categories)), dtype=np.int64)
+        np.add.at(counts, (rows, columns), 1)
+        return counts
+
+    def grouped_counts(self, groups):
+        """
+        Scores every text of every group in one batch.
+        groups: list of lists of texts. Returns an array of shape
+        (len(groups), len(categories)) with per-group category totals.
+        """
+        texts = [text for group in groups for text in group]
+        owners = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+        # Identical texts (a story shared by several groups) are scored once.
+        unique = {}
+        positions = np.array([unique.setdefault(text, len(unique)) for text in texts], dtype=np.int64)
+        counts = self.count_matrix(list(unique))
+        totals = np.zeros((len(groups), len(self.categories)), dtype=np.int64)
+        np.add.at(totals, owners, counts[positions].reshape(len(texts), len(self.categories)))
+        return totals
@@ -0,0 +1,112 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from ticker_cache import normalize_name
+
+STORE_PATH = os.getenv("SENTIMENT_STORE_PATH", os.path.join(".cache", "sentiment.sqlite"))
+COUNT_COLUMNS = ["growth", "stable", "risk", "articles"]
+
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(STORE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=5)
+        # articles: append-only log, one row per company and article, which
+        # doubles as the "seen" set. daily: running per-day totals of it.
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "company TEXT NOT NULL, article_key TEXT NOT NULL, day TEXT NOT NULL, "
+            "growth INTEGER NOT NULL, stable INTEGER NOT NULL, risk INTEGER NOT NULL, "
+            "PRIMARY KEY (company, article_key));"
+            "CREATE TABLE IF NOT EXISTS daily ("
+            "company TEXT NOT NULL, day TEXT NOT NULL, "
+            "growth INTEGER NOT NULL, stable INTEGER NOT NULL, risk INTEGER NOT NULL, "
+            "articles INTEGER NOT NULL, PRIMARY KEY (company, day));"
+        )
+        _local.conn = conn
+    return conn
+
+
+def record_articles(company_name, rows):
+    """
+    Adds scored articles for a company: rows of (article_key, day, growth,
+    stable, risk), with day as "YYYY-MM-DD". Articles already recorded for
+    the company are skipped, so refetching the same news never counts twice
+    and history is never rescored. Returns the number of new articles.
+    """
+    company = normalize_name(company_name)
+    conn = _connection()
+    added = 0
+    with conn:
+        for article_key, day, growth, stable, risk in rows:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO articles (company, article_key, day, growth, stable, risk) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (company, article_key, day, int(growth), int(stable), int(risk)),
+            ).rowcount
+            if not inserted:
+                continue
+            added += 1
+            conn.execute(
+                "INSERT INTO daily (company, day, growth, stable, risk, articles) VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (company, day) DO UPDATE SET growth = growth + excluded.growth, "
+                "stable = stable + excluded.stable, risk = risk + excluded.risk, articles = articles + 1",
+                (company, day, int(growth), int(stable), int(risk)),
+            )
+    return added
+
+
+def daily_counts(company_name, start=None, end=None):
+    """
+    Per-day totals for a company between start and end (dates or ISO
+    strings, inclusive) as a DataFrame indexed by day, with one row per
+    calendar day and zeros on days without articles.
+    """
+    end = pd.Timestamp(end or datetime.date.today()).normalize()
+    start = pd.Timestamp(start).normalize() if start is not None else None
+    query = "SELECT day, growth, stable, risk, articles FROM daily WHERE company = ? AND day <= ?"
+    params = [normalize_name(company_name), end.date().isoformat()]
+    if start is not None:
+        query += " AND day >= ?"
+        params.append(start.date().isoformat())
+    rows = _connection().execute(query + " ORDER BY day", params).fetchall()
+
+    frame = pd.DataFrame(rows, columns=["day"] + COUNT_COLUMNS)
+    frame["day"] = pd.to_datetime(frame["day"])
+    frame = frame.set_index("day")
+    if start is None:
+        if frame.empty:
+            return frame
+        start = frame.index[0]
+    days = pd.date_range(start, end, freq="D", name="day")
+    return frame.reindex(days, fill_value=0).astype("int64")
+
+
+def rolling_counts(company_name, window_days=7, start=None, end=None):
+    """
+    Trailing window_days sums of the daily totals for every day between
+    start and end. Days before start are read as needed to fill the first
+    window.
+    """
+    end = pd.Timestamp(end or datetime.date.today()).normalize()
+    first = pd.Timestamp(start).normalize() if start is not None else None
+    read_from = first - pd.Timedelta(days=window_days - 1) if first is not None else None
+    daily = daily_counts(company_name, read_from, end)
+    rolled = daily.rolling(window_days, min_periods=1).sum().astype("int64")
+    return rolled if first is None else rolled[rolled.index >= first]
+
+
+def clear_sentiment_store():
+    conn = _connection()
+    with conn:
+        conn.execute("DELETE FROM articles")
+        conn.execute("DELETE FROM daily")
@@ -0,0 +1,124 @@
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import make_cache, make_key
+
+SINGLE_PROMPT = "Summarize this news article in 1-2 sentences:\n{content}"
+BATCH_PROMPT = (
+    "Summarize each of the following {count} news articles in 1-2 sentences. "
+    "Reply with exactly one line per article, formatted as '<number>. <summary>'.\n\n{articles}"
+)
+
+# Summaries depend only on the article text and the model, so keep them long.
+# Configure with SUMMARY_CACHE_BACKEND/TTL/MAX_ENTRIES/PATH.
+summary_cache = make_cache("summary", ttl=7 * 24 * 3600, max_entries=4096)
+# Articles per prompt: one call per company for the default NEWS_MAX_ARTICLES.
+DEFAULT_BATCH_SIZE = 5
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.)]\s*(.+)$")
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def model_id(llm):
+    """
+    Identifies a model for cache keys: its model/model_name attribute if it
+    has one. Otherwise a plain function is identified by its module and
+    qualified name, and any other callable by its class's. Lambdas and
+    nested functions also get their id(), since their names are not unique.
+    """
+    name = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    if name:
+        return str(name)
+    target = llm if hasattr(llm, "__qualname__") else type(llm)
+    name = f"{target.__module__}.{target.__qualname__}"
+    return f"{name}@{id(llm):x}" if "<" in name else name
+
+
+def _as_text(output):
+    # Chat models return message objects rather than plain strings.
+    return str(getattr(output, "content", output)).strip()
+
+
+def _summarize_one(llm, content):
+    return _as_text(llm(SINGLE_PROMPT.format(content=content)))
+
+
+def _summarize_batch(llm, contents):
+    """
+    Summarizes several articles with one multi-document prompt. Articles the
+    reply does not cover are summarized individually.
+    """
+    articles = "\n\n".join(f"Article {i}:\n{content}" for i, content in enumerate(contents, 1))
+    reply = _as_text(llm(BATCH_PROMPT.format(count=len(contents), articles=articles)))
+    summaries = [None] * len(contents)
+    for line in reply.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match and 1 <= int(match.group(1)) <= len(contents):
+            summaries[int(match.group(1)) - 1] = match.group(2).strip()
+    return [summary or _summarize_one(llm, content) for summary, content in zip(summaries, contents)]
+
+
+def summarize_contents(contents, llm, max_workers=4, batch_size=DEFAULT_BATCH_SIZE, model=None):
+    """
+    Summarizes article texts with llm, returning summaries in input order.
+    Each text is looked up in summary_cache by (model, content hash) first,
+    where model defaults to model_id(llm); misses are sent in groups of
+    batch_size (one prompt per group) across at most max_workers concurrent
+    calls, and the results are cached. Texts another caller is already
+    summarizing are waited for, not summarized again.
+    """
+    model = model or model_id(llm)
+    keys = [make_key(model, content_hash(content)) for content in contents]
+    # Identical articles in one call are summarized once.
+    content_for = dict(zip(keys, contents))
+
+    def run(group):
+        group_contents = [content_for[key] for key in group]
+        if len(group_contents) == 1:
+            return [_summarize_one(llm, group_contents[0])]
+        return _summarize_batch(llm, group_contents)
+
+    def summarize_missing(missing):
+        groups = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        if len(groups) == 1:
+            results = [run(groups[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as pool:
+                results = list(pool.map(run, groups))
+        return {key: summary for group, summaries in zip(groups, results) for key, summary in zip(group, summaries)}
+
+    summaries = summary_cache.get_or_compute_many(keys, summarize_missing)
+    return [summaries[key] for key in keys]
+
+
+class StubLLM:
+    """
+    Deterministic local stand-in for an LLM, used by the offline benchmarks
+    (benchmarks/run.py --llm) to exercise the summarization path.
+    Summarizes an article as its first line (trimmed to max_words words) and
+    answers multi-article prompts with one numbered line per article.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, max_words=25):
+        self.max_words = max_words
+        self.calls = 0
+
+    def _summary(self, article):
+        lines = [line.strip() for line in article.splitlines() if line.strip()]
+        words = (lines[0] if lines else "").split()
+        return " ".join(words[:self.max_words])
+
+    def __call__(self, prompt):
+        self.calls += 1
+        parts = re.split(r"^Article (\d+):\n", prompt, flags=re.MULTILINE)
+        if len(parts) == 1:
+            return self._summary(prompt.split("\n", 1)[-1])
+        return "\n".join(
+            f"{number}. {self._summary(article)}" for number, article in zip(parts[1::2], parts[2::2])
+        )
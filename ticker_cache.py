@@ -0,0 +1,178 @@
+import bisect
+import csv
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+CACHE_PATH = os.getenv("TICKER_CACHE_PATH", os.path.join(".cache", "tickers.sqlite"))
+INDEX_PATH = os.getenv("TICKER_INDEX_PATH", "")
+
+# Resolved symbols rarely change; failed lookups are retried sooner.
+POSITIVE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+# Most index names compared by the fuzzy fallback of match_symbol.
+FUZZY_CANDIDATES = 200
+
+_local = threading.local()
+_index = None
+_index_lock = threading.Lock()
+
+
+def normalize_name(company_name):
+    """
+    Lowercases, strips punctuation and collapses whitespace so that
+    "HDFC Bank", " hdfc  bank " and "HDFC-Bank" share one cache entry.
+    """
+    name = re.sub(r"[^\w\s]", " ", company_name.lower())
+    return " ".join(name.split())
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=5)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickers ("
+            "name TEXT PRIMARY KEY, symbol TEXT, expires_at REAL NOT NULL)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def get_cached_ticker(company_name):
+    """
+    Returns (hit, symbol). A hit with symbol None is a cached negative result.
+    """
+    row = _connection().execute(
+        "SELECT symbol, expires_at FROM tickers WHERE name = ?",
+        (normalize_name(company_name),),
+    ).fetchone()
+    if row is None or row[1] < time.time():
+        return False, None
+    return True, row[0]
+
+
+def cache_ticker(company_name, symbol):
+    """
+    Stores a lookup result; symbol None records that no ticker was found.
+    """
+    ttl = POSITIVE_TTL if symbol else NEGATIVE_TTL
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO tickers (name, symbol, expires_at) VALUES (?, ?, ?)",
+            (normalize_name(company_name), symbol, time.time() + ttl),
+        )
+
+
+def invalidate_ticker(company_name):
+    """
+    Forgets the cached lookup for one company, so the next one goes to the
+    index or Yahoo again.
+    """
+    conn = _connection()
+    with conn:
+        conn.execute("DELETE FROM tickers WHERE name = ?", (normalize_name(company_name),))
+
+
+def clear_ticker_cache():
+    conn = _connection()
+    with conn:
+        conn.execute("DELETE FROM tickers")
+
+
+def load_symbol_index(path):
+    """
+    Loads a CSV of exchange listings with at least "symbol" and "name"
+    columns. Returns {"names": {normalized name: symbol}, "sorted": [...],
+    "symbols": {upper symbol: symbol}, "words": {word: [names]}}.
+    """
+    names = {}
+    symbols = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            symbol = (row.get("symbol") or "").strip()
+            name = normalize_name(row.get("name") or "")
+            if not symbol:
+                continue
+            symbols[symbol.upper()] = symbol
+            if name:
+                names.setdefault(name, symbol)
+    words = {}
+    for name in names:
+        for word in set(name.split()):
+            words.setdefault(word, []).append(name)
+    return {"names": names, "sorted": sorted(names), "symbols": symbols, "words": words}
+
+
+def _get_index():
+    global _index
+    if _index is None and INDEX_PATH and os.path.exists(INDEX_PATH):
+        with _index_lock:
+            if _index is None:
+                _index = load_symbol_index(INDEX_PATH)
+    return _index
+
+
+def match_symbol(index, company_name, cutoff=0.85):
+    """
+    Matches a company name against a symbol index: exact symbol, exact name,
+    shortest name starting with the query, then a fuzzy match.
+    """
+    if company_name.strip().upper() in index["symbols"]:
+        return index["symbols"][company_name.strip().upper()]
+    query = normalize_name(company_name)
+    if not query:
+        return None
+    if query in index["names"]:
+        return index["names"][query]
+
+    sorted_names = index["sorted"]
+    start = bisect.bisect_left(sorted_names, query)
+    prefixed = []
+    for name in sorted_names[start:]:
+        if not name.startswith(query):
+            break
+        prefixed.append(name)
+    if prefixed:
+        return index["names"][min(prefixed, key=len)]
+
+    close = difflib.get_close_matches(query, _fuzzy_candidates(index, query), n=1, cutoff=cutoff)
+    return index["names"][close[0]] if close else None
+
+
+def _fuzzy_candidates(index, query, limit=FUZZY_CANDIDATES):
+    """
+    The names worth a fuzzy comparison: those sharing the most words with
+    the query, plus those sharing its first three letters. Comparing
+    against every listing takes ~100 ms on a full exchange index.
+    """
+    shared = Counter()
+    for word in set(query.split()):
+        shared.update(index["words"].get(word, ()))
+    candidates = {name for name, _ in shared.most_common(limit)}
+    sorted_names = index["sorted"]
+    start = bisect.bisect_left(sorted_names, query[:3])
+    for name in sorted_names[start:start + limit]:
+        if not name.startswith(query[:3]):
+            break
+        candidates.add(name)
+    return candidates
+
+
+def lookup_local_symbol(company_name):
+    """
+    Resolves a company name from the preloaded symbol index, if one is
+    configured via TICKER_INDEX_PATH. Returns None when there is no match.
+    """
+    index = _get_index()
+    if index is None:
+        return None
+    return match_symbol(index, company_name)
@@ -1,96 +1,245 @@
 import datetime
-import requests
+import numpy as np
 import streamlit as st
-import yfinance as yf
-import matplotlib.pyplot as plt
-from langchain.schema import Document
-from bs4 import BeautifulSoup
 
-def fetch_news(company_name, api_key):
-    today = datetime.date.today().isoformat()
-    url = "https://newsdata.io/api/1/news"
+import http_client
+import instrumentation
+import sentiment_store
+from articles import Article
+from cache import make_cache, make_key
+from charts import DEFAULT_MAX_POINTS, VIEWS, downsample, price_chart, transform
+from dedup import content_hash, normalize_url
+from scoring import KeywordScorer
+from summarizer import DEFAULT_BATCH_SIZE, summarize_contents
+from ticker_cache import cache_ticker, get_cached_ticker, lookup_local_symbol
+from yahoo_lookup import best_symbol
+
+NEWS_URL = "https://newsdata.io/api/1/news"
+
+# Shared by all sessions; configure with NEWS_CACHE_BACKEND/TTL/MAX_ENTRIES/PATH.
+news_cache = make_cache("news", ttl=15 * 60)
+
+# Simple sentiment analysis: positive/negative words for conclusions,
+# growth/stability/risk words for the investment recommendation.
+POSITIVE_KEYWORDS = ["growth", "profit", "gain", "strong", "beat", "record", "increase", "up", "surge", "improve"]
+NEGATIVE_KEYWORDS = ["loss", "decline", "drop", "fall", "down", "weak", "scandal", "cut", "negative", "decrease"]
+GROWTH_KEYWORDS = ["record", "growth", "soared", "profit", "surge", "beat", "increase", "expanding", "momentum", "innovation", "revenue", "up", "jump", "strong", "supremacy"]
+STABLE_KEYWORDS = ["steady", "stable", "diversified", "consistent", "reliable", "long-term", "core", "retail", "telecom", "industrial", "operations"]
+RISK_KEYWORDS = ["volatile", "risk", "loss", "decline", "uncertain", "high expectations", "priced in", "sell-off"]
+# Other forms that count as a keyword. Listed by hand: a blanket suffix rule
+# would also turn "UPS" into "up" and "cores" into "core".
+KEYWORD_INFLECTIONS = {
+    "profit": ["profits"],
+    "gain": ["gains", "gained", "gaining"],
+    "beat": ["beats", "beating"],
+    "increase": ["increases", "increased", "increasing"],
+    "surge": ["surges", "surged", "surging"],
+    "improve": ["improves", "improved", "improving"],
+    "jump": ["jumps", "jumped", "jumping"],
+    "loss": ["losses"],
+    "decline": ["declines", "declined", "declining"],
+    "drop": ["drops", "dropped", "dropping"],
+    "fall": ["falls", "fell", "falling"],
+    "cut": ["cuts", "cutting"],
+    "decrease": ["decreases", "decreased", "decreasing"],
+    "risk": ["risks"],
+}
+
+sentiment_scorer = KeywordScorer({"positive": POSITIVE_KEYWORDS, "negative": NEGATIVE_KEYWORDS}, KEYWORD_INFLECTIONS)
+recommendation_scorer = KeywordScorer(
+    {"growth": GROWTH_KEYWORDS, "stable": STABLE_KEYWORDS, "risk": RISK_KEYWORDS}, KEYWORD_INFLECTIONS
+)
+# score = growth + 0.5 * stable - risk
+RECOMMENDATION_WEIGHTS = [1.0, 0.5, -1.0]
+
+class NewsAPIError(Exception):
+    pass
+
+# Defaults match the original behaviour: today's articles only, at most 5.
+NEWS_LOOKBACK_DAYS = 1
+NEWS_MAX_ARTICLES = 5
+NEWS_MAX_PAGES = 5
+
+def _download_news_page(query, api_key, language, page=None):
     params = {
         "apikey": api_key,
-        "q": f"{company_name} stock",
-        "language": "en"
+        "q": query,
+        "language": language
     }
-    try:
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            st.error(f"NewsData API error {response.status_code}: {response.text}")
-            return []
-        json_data = response.json()
-        articles = json_data.get("results", [])
-        docs = []
+    if page:
+        params["page"] = page
+    with instrumentation.span("news_page", query=query):
+        response = http_client.get(NEWS_URL, params=params, timeout=10)
+    if response.status_code != 200:
+        raise NewsAPIError(f"NewsData API error {response.status_code}: {response.text}")
+    json_data = response.json()
+    return json_data.get("results", []), json_data.get("nextPage")
+
+def _fetch_news_page(query, api_key, language, page=None):
+    """
+    One page of NewsData results as (articles, next_page), served from
+    news_cache when possible. Pages are keyed by (query, language, date,
+    page cursor); identical concurrent requests share one upstream call.
+    """
+    today = datetime.date.today().isoformat()
+    return news_cache.get_or_compute(
+        make_key(query, language, today, page),
+        lambda: _download_news_page(query, api_key, language, page),
+    )
+
+def invalidate_news(company_name, language="en"):
+    """
+    Drops today's cached first page for a company, so the next fetch goes
+    upstream. Later pages are keyed by cursors from the new first page.
+    """
+    today = datetime.date.today().isoformat()
+    news_cache.invalidate(make_key(f"{company_name} stock", language, today, None))
+
+def refresh_news(company_name, api_key, language="en", lookback_days=NEWS_LOOKBACK_DAYS,
+                 max_articles=NEWS_MAX_ARTICLES):
+    """
+    Refetches today's first news page for a company from upstream and
+    replaces the cached copy only once that succeeds, so a failed refresh
+    leaves the previous page in place. Returns the Articles (see
+    iter_news); errors are raised to the caller.
+    """
+    query = f"{company_name} stock"
+    today = datetime.date.today().isoformat()
+    news_cache.set(make_key(query, language, today, None), _download_news_page(query, api_key, language))
+    return list(iter_news(company_name, api_key, language, lookback_days, max_articles))
+
+def _article_to_document(article):
+    content = f"{article.get('title', '')}\n{article.get('description', '')}\n{article.get('link', '')}"
+    return Article(content, {"source": article.get("link", ""), "published": article.get("pubDate", "")[:10]})
+
+def iter_news(company_name, api_key, language="en", lookback_days=NEWS_LOOKBACK_DAYS,
+              max_articles=NEWS_MAX_ARTICLES, max_pages=NEWS_MAX_PAGES):
+    """
+    Lazily yields Articles for a company's news, following NewsData
+    nextPage cursors only as far as needed. Keeps articles published within
+    the last lookback_days (1 = today only) and stops after max_articles,
+    after max_pages, or once a whole page is older than the window.
+    Errors are raised to the caller; articles already yielded stay valid.
+    """
+    since = (datetime.date.today() - datetime.timedelta(days=lookback_days - 1)).isoformat()
+    query = f"{company_name} stock"
+    page = None
+    count = 0
+    for _ in range(max_pages):
+        articles, page = _fetch_news_page(query, api_key, language, page)
+        older = 0
         for article in articles:
             pub_date = article.get("pubDate", "")[:10]
-            if pub_date == today:
-                content = f"{article.get('title', '')}\n{article.get('description', '')}\n{article.get('link', '')}"
-                docs.append(Document(page_content=content, metadata={"source": article.get("link", "")}))
-            if len(docs) >= 5:
-                break
-        return docs
+            if pub_date >= since:
+                yield _article_to_document(article)
+                count += 1
+                if count >= max_articles:
+                    return
+            elif pub_date:
+                older += 1
+        if not page or (articles and older == len(articles)):
+            return
+
+def fetch_news(company_name, api_key, language="en", lookback_days=NEWS_LOOKBACK_DAYS,
+               max_articles=NEWS_MAX_ARTICLES):
+    """
+    Fetches recent news for a company as a list of Articles (see iter_news).
+    Errors are shown and whatever was fetched before the error is returned.
+    """
+    docs = []
+    try:
+        for doc in iter_news(company_name, api_key, language, lookback_days, max_articles):
+            docs.append(doc)
+    except NewsAPIError as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"Failed to fetch news: {e}")
-        return []
+    return docs
+
+@instrumentation.timed("render_chart")
+def plot_stock_price(price_data, title="Stock Price Comparison - Last 7 Days", backend="altair", view="price",
+                     max_points=DEFAULT_MAX_POINTS):
+    """
+    Plots closing prices for each ticker.
+    backend "altair" sends a compact, downsampled series to an interactive
+    browser-side chart; "matplotlib" renders a static image. view is one of
+    "price", "normalized" or "percent" (see charts.VIEWS).
+    """
+    for ticker, prices in price_data.items():
+        if prices.empty:
+            st.warning(f"No price data found for {ticker}")
+    if backend == "altair":
+        st.altair_chart(price_chart(price_data, title, view, max_points), use_container_width=True)
+        return
+
+    # Only the static backend needs matplotlib; importing it costs about a second.
+    import matplotlib.pyplot as plt
 
-def plot_stock_price(price_data):
     fig, ax = plt.subplots(figsize=(10, 6))
     for ticker, prices in price_data.items():
         if not prices.empty:
+            prices = downsample(transform(prices, view), max_points)
             ax.plot(prices.index, prices.values, label=ticker)
-        else:
-            st.warning(f"No price data found for {ticker}")
-    ax.set_title("Stock Price Comparison - Last 7 Days")
+    ax.set_title(title)
     ax.set_xlabel("Date")
-    ax.set_ylabel("Closing Price (in INR/USD)")
+    ax.set_ylabel(VIEWS[view])
     ax.legend()
     fig.autofmt_xdate()  # Prevent overlapping dates
     st.pyplot(fig)
+    plt.close(fig)  # Figures are otherwise kept alive by pyplot between reruns
 
 def get_yahoo_ticker(company_name):
     """
     Find the most probable stock ticker from Yahoo Finance search results.
+    Checks the on-disk lookup cache and then the local symbol index, and
+    only hits Yahoo on a miss. Listings on the results page are ranked by
+    name similarity, exchange and security type (see yahoo_lookup).
+    Index matches and Yahoo results, found or not, are cached, so repeat
+    lookups skip the index's fuzzy match.
     """
+    hit, symbol = get_cached_ticker(company_name)
+    if hit:
+        instrumentation.incr("ticker_resolved", source="cache")
+        return symbol
+    symbol = lookup_local_symbol(company_name)
+    if symbol:
+        instrumentation.incr("ticker_resolved", source="index")
+        cache_ticker(company_name, symbol)
+        return symbol
+    instrumentation.incr("ticker_resolved", source="yahoo")
+
     search_url = f"https://finance.yahoo.com/lookup?s={company_name.replace(' ', '+')}"
     headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(search_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        for row in soup.find_all("tr"):
-            cols = row.find_all("td")
-            if len(cols) >= 2:
-                symbol = cols[0].text.strip()
-                name = cols[1].text.strip().lower()
-                if company_name.lower() in name:
-                    return symbol
-        # Fallback: return first symbol found
-        symbol_cell = soup.find("td", attrs={"data-test": "QUOTE_SYMBOL"})
-        if symbol_cell:
-            return symbol_cell.text.strip()
-        return None
+        with instrumentation.span("ticker_lookup", company_name):
+            response = http_client.get(search_url, headers=headers, timeout=10)
+        with instrumentation.span("ticker_parse", company_name):
+            symbol = best_symbol(company_name, response.text)
+        if response.status_code == 200:
+            cache_ticker(company_name, symbol)
+        return symbol
     except Exception as e:
         st.error(f"Error fetching ticker for {company_name}: {e}")
         return None
 
-def summarize_news(news_docs, llm=None):
+def summarize_news(news_docs, llm=None, max_workers=4, batch_size=DEFAULT_BATCH_SIZE):
     """
     Summarizes each news article.
     If an LLM is provided, use it; otherwise, use the first two lines as a summary.
+    LLM summaries are cached by content hash and requested concurrently, in
+    groups of batch_size articles per prompt (see summarizer.summarize_contents).
     Returns a list of (summary, source_url) tuples.
     """
-    summaries = []
-    for doc in news_docs:
-        content = doc.page_content
-        if llm:
-            prompt = f"Summarize this news article in 1-2 sentences:\n{content}"
-            summary = llm(prompt)
-        else:
+    contents = [doc.page_content for doc in news_docs]
+    if llm:
+        with instrumentation.span("summarize", articles=len(contents)):
+            summary_texts = summarize_contents(contents, llm, max_workers=max_workers, batch_size=batch_size)
+    else:
+        summary_texts = []
+        for content in contents:
             lines = [line.strip() for line in content.split('\n') if line.strip()]
-            summary = " ".join(lines[:2]) if lines else ""
-        source_url = doc.metadata.get("source", "")
-        summaries.append((summary, source_url))
-    return summaries
+            summary_texts.append(" ".join(lines[:2]) if lines else "")
+    return [(summary, doc.metadata.get("source", "")) for summary, doc in zip(summary_texts, news_docs)]
 
 def conclude_from_news(news_summaries, company_name):
     """
@@ -101,18 +250,9 @@ def conclude_from_news(news_summaries, company_name):
     if not news_summaries:
         return f"**{company_name}:**\n_No recent news articles found for this stock. Please check back later or consider other sources._"
 
-    # Simple sentiment analysis: count positive/negative words
-    pos_keywords = ["growth", "profit", "gain", "strong", "beat", "record", "increase", "up", "surge", "improve"]
-    neg_keywords = ["loss", "decline", "drop", "fall", "down", "weak", "scandal", "cut", "negative", "decrease"]
-
-    pos_count = 0
-    neg_count = 0
-    for summary, _ in news_summaries:
-        s = summary.lower()
-        if any(word in s for word in pos_keywords):
-            pos_count += 1
-        if any(word in s for word in neg_keywords):
-            neg_count += 1
+    # Count summaries containing at least one positive/negative word
+    counts = sentiment_scorer.count_matrix([summary for summary, _ in news_summaries])
+    pos_count, neg_count = (counts > 0).sum(axis=0)
 
     if pos_count > neg_count:
         sentiment = "positive"
@@ -133,34 +273,79 @@ def conclude_from_news(news_summaries, company_name):
     )
     return conclusion
 
-def investment_recommendation_from_news(all_summaries, input_names):
+def score_companies(all_summaries, input_names):
+    """
+    Scores every company's summaries in one batch.
+    Returns {company_name: {"growth", "stable", "risk", "score", "articles"}},
+    where score = growth + 0.5 * stable - risk.
+    """
+    groups = [[summary for summary, _ in all_summaries.get(name, [])] for name in input_names]
+    totals = recommendation_scorer.grouped_counts(groups)
+    weighted = totals @ np.array(RECOMMENDATION_WEIGHTS)
+    results = {}
+    for i, name in enumerate(input_names):
+        growth, stable, risk = (int(count) for count in totals[i])
+        results[name] = {
+            "growth": growth,
+            "stable": stable,
+            "risk": risk,
+            "score": float(weighted[i]),
+            "articles": len(groups[i]),
+        }
+    return results
+
+def record_sentiment(company_name, docs, summaries):
+    """
+    Scores each article's summary for growth/stability/risk keywords and
+    adds it to the company's persisted daily sentiment (see sentiment_store),
+    dated by its publication day. docs and summaries are parallel lists, as
+    in run_comparison results. Articles recorded before are skipped.
+    Returns the number of newly recorded articles.
+    """
+    if not summaries:
+        return 0
+    counts = recommendation_scorer.count_matrix([summary for summary, _ in summaries])
+    today = datetime.date.today().isoformat()
+    rows = []
+    for doc, (growth, stable, risk) in zip(docs, counts):
+        article_key = normalize_url(doc.metadata.get("source", "")) or content_hash(doc.page_content)
+        rows.append((article_key, doc.metadata.get("published") or today, growth, stable, risk))
+    return sentiment_store.record_articles(company_name, rows)
+
+def sentiment_history(company_name, start=None, end=None, window_days=7):
+    """
+    Rolling window_days news sentiment for each day from start to end:
+    growth/stable/risk/articles sums over the window, their score
+    (growth + 0.5 * stable - risk, as in score_companies) and the score per
+    article (NaN when the window has no articles).
+    """
+    history = sentiment_store.rolling_counts(company_name, window_days, start, end)
+    history["score"] = history[["growth", "stable", "risk"]].to_numpy() @ np.array(RECOMMENDATION_WEIGHTS)
+    history["score_per_article"] = history["score"] / history["articles"].where(history["articles"] > 0)
+    return history
+
+def investment_recommendation_from_news(all_summaries, input_names, technical_scores=None, technical_weight=1.0):
     """
     Given all_summaries: dict of {company_name: [(summary, url), ...]}
     and input_names: list of company names,
     returns a short, actionable investment recommendation.
+    technical_scores: optional {company_name: score} from price metrics
+    (see metrics.technical_scores), added to the news score with technical_weight.
     """
-    # Define keywords for hype/growth and stability
-    growth_keywords = ["record", "growth", "soared", "profit", "surge", "beat", "increase", "expanding", "momentum", "innovation", "revenue", "up", "jump", "strong", "supremacy"]
-    stable_keywords = ["steady", "stable", "diversified", "consistent", "reliable", "long-term", "core", "retail", "telecom", "industrial", "operations"]
-    risk_keywords = ["volatile", "risk", "loss", "decline", "uncertain", "high expectations", "priced in", "sell-off"]
-
+    technical_scores = technical_scores or {}
     scores = {}
     notes = {}
-
-    for name in input_names:
-        summaries = all_summaries.get(name, [])
-        if not summaries:
+    for name, result in score_companies(all_summaries, input_names).items():
+        if not result["articles"]:
             scores[name] = 0
             notes[name] = "No recent news."
-            continue
-
-        text = " ".join(summary for summary, _ in summaries).lower()
-        growth = sum(text.count(word) for word in growth_keywords)
-        stable = sum(text.count(word) for word in stable_keywords)
-        risk = sum(text.count(word) for word in risk_keywords)
-        score = growth + 0.5 * stable - risk
-        scores[name] = score
-        notes[name] = f"Growth: {growth}, Stability: {stable}, Risk: {risk}"
+        else:
+            scores[name] = result["score"]
+            notes[name] = f"Growth: {result['growth']}, Stability: {result['stable']}, Risk: {result['risk']}"
+        technical = technical_scores.get(name)
+        if technical is not None and not np.isnan(technical):
+            scores[name] += technical_weight * technical
+            notes[name] += f" Technical: {technical:+.2f}" if not result["articles"] else f", Technical: {technical:+.2f}"
 
     # Find best and second-best
     sorted_stocks = sorted(scores.items(), key=lambda x: x[1], reverse=True)
@@ -172,7 +357,8 @@ def investment_recommendation_from_news(all_summaries, input_names):
         return "No actionable investment recommendation can be made due to lack of recent news."
 
     recommendation = f"**Investment Recommendation:**\n\n"
-    recommendation += f"- **{best_stock}** shows the strongest positive signals in recent news ({notes[best_stock]}). "
+    signals = "recent news and price trends" if technical_scores else "recent news"
+    recommendation += f"- **{best_stock}** shows the strongest positive signals in {signals} ({notes[best_stock]}). "
     if second_stock:
         recommendation += f"\n- **{second_stock}** is also mentioned, but with less positive momentum ({notes[second_stock]})."
     recommendation += "\n\n*If you seek high growth and can tolerate volatility, consider the top pick. For lower risk and steady performance, consider the alternative. Always match your choice to your risk tolerance and investment goals.*"
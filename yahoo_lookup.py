@@ -0,0 +1,192 @@
+import difflib
+import json
+import re
+
+from ticker_cache import normalize_name
+
+# Preference for where a match is listed, by Yahoo exchange code or display
+# name (lowercased). Primary US and Indian listings first; OTC and secondary
+# European listings of the same company last.
+EXCHANGE_SCORES = {
+    "nms": 1.0, "ngm": 1.0, "ncm": 1.0, "nasdaq": 1.0, "nasdaqgs": 1.0, "nasdaqgm": 1.0, "nasdaqcm": 1.0,
+    "nyq": 1.0, "nyse": 1.0, "ase": 0.8, "nyse american": 0.8, "pcx": 0.8, "nyse arca": 0.8,
+    "nsi": 1.0, "nse": 1.0, "bse": 0.9, "bom": 0.9,
+    "lse": 0.6, "tor": 0.6, "toronto": 0.6, "asx": 0.6, "hkg": 0.6, "jpx": 0.6, "tokyo": 0.6,
+    "pnk": 0.2, "oqx": 0.2, "oqb": 0.2, "other otc": 0.2, "otc markets": 0.2,
+    "fra": 0.1, "frankfurt": 0.1, "ger": 0.1, "xetra": 0.1, "mun": 0.1, "munich": 0.1, "stu": 0.1,
+    "stuttgart": 0.1, "ber": 0.1, "berlin": 0.1, "dus": 0.1, "dusseldorf": 0.1, "ham": 0.1,
+    "hamburg": 0.1, "vie": 0.1, "vienna": 0.1, "mex": 0.1, "mexico": 0.1,
+}
+UNKNOWN_EXCHANGE_SCORE = 0.4
+TYPE_SCORES = {"equity": 1.0, "etf": 0.3, "mutualfund": 0.2, "index": 0.1, "future": 0.0, "option": 0.0}
+
+# Name similarity dominates; exchange and type break ties between listings of one company.
+NAME_WEIGHT = 1.0
+EXCHANGE_WEIGHT = 0.25
+TYPE_WEIGHT = 0.15
+# Listings whose name is less similar than this are never picked: the page
+# also carries unrelated quotes (trending tickers, market summary).
+MIN_NAME_SIMILARITY = 0.5
+
+# Legal suffixes ignored when comparing names ("Apple Inc." == "Apple").
+_SUFFIXES = re.compile(
+    r"\b(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|sa|ag|nv|se|holdings?|group)\b"
+)
+_TABLE = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+_QUOTES = re.compile(r'"(?:quotes|items)"\s*:\s*\[')
+
+
+def _core_name(name):
+    return " ".join(_SUFFIXES.sub(" ", normalize_name(name)).split())
+
+
+def name_similarity(query, name):
+    """
+    0..1 similarity of a company name to a listing name, ignoring case,
+    punctuation and legal suffixes. A query that is the leading words of
+    the name ("Reliance" vs "Reliance Industries") scores just below an
+    exact match.
+    """
+    query, name = _core_name(query), _core_name(name)
+    if not query or not name:
+        return 0.0
+    if query == name:
+        return 1.0
+    if name.startswith(query + " ") or query.startswith(name + " "):
+        return 0.9
+    return difflib.SequenceMatcher(None, query, name).ratio() * 0.85
+
+
+def _candidate(symbol, name="", exchange="", quote_type=""):
+    return {
+        "symbol": symbol.strip(),
+        "name": name.strip(),
+        "exchange": exchange.strip(),
+        "type": quote_type.strip(),
+    }
+
+
+def _json_candidates(page):
+    # Search results embedded as JSON ("quotes": [{"symbol": ..., "shortname": ...}]).
+    decoder = json.JSONDecoder()
+    candidates = []
+    for match in _QUOTES.finditer(page):
+        try:
+            items, _ = decoder.raw_decode(page, match.end() - 1)
+        except ValueError:
+            continue
+        for item in items:
+            if isinstance(item, dict) and item.get("symbol"):
+                candidates.append(_candidate(
+                    str(item["symbol"]),
+                    str(item.get("shortname") or item.get("longname") or item.get("name") or ""),
+                    str(item.get("exchange") or item.get("exchDisp") or ""),
+                    str(item.get("quoteType") or item.get("typeDisp") or ""),
+                ))
+    return candidates
+
+
+def _rows_lxml(table):
+    from lxml import html as lxml_html
+
+    root = lxml_html.fragment_fromstring(table)
+    return [
+        [(cell.tag, cell.text_content()) for cell in row.iterchildren("td", "th")]
+        for row in root.iter("tr")
+    ]
+
+
+def _rows_bs4(table):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(table, "html.parser")
+    return [[(cell.name, cell.get_text()) for cell in row.find_all(["td", "th"])] for row in soup.find_all("tr")]
+
+
+def _cell(cells, columns, key):
+    index = columns.get(key)
+    return cells[index] if index is not None and index < len(cells) else ""
+
+
+def _table_candidates(page):
+    """
+    Candidates from the results table(s). Only the <table> elements are
+    parsed, not the scripts and styles around them, with lxml if installed
+    and BeautifulSoup otherwise. Columns are found by header text,
+    defaulting to symbol then name.
+    """
+    try:
+        import lxml  # noqa: F401
+        parse_rows = _rows_lxml
+    except ImportError:
+        parse_rows = _rows_bs4
+
+    candidates = []
+    for table in _TABLE.findall(page):
+        columns = {"symbol": 0, "name": 1}
+        for row in parse_rows(table):
+            if not row:
+                continue
+            if all(tag == "th" for tag, _ in row):
+                headers = [text.strip().lower() for _, text in row]
+                for key in ("symbol", "name", "exchange", "type"):
+                    if key in headers:
+                        columns[key] = headers.index(key)
+                continue
+            cells = [text for tag, text in row if tag == "td"]
+            if len(cells) < 2:
+                continue
+            fields = [_cell(cells, columns, key) for key in ("symbol", "name", "exchange", "type")]
+            candidates.append(_candidate(*fields))
+    return [candidate for candidate in candidates if candidate["symbol"]]
+
+
+def extract_candidates(page):
+    """
+    Listings on a Yahoo lookup/search page as [{"symbol", "name",
+    "exchange", "type"}]: the results table first, then quotes from the
+    embedded JSON payloads that the table does not list. A JSON quote for a
+    symbol in the table only fills in fields the table left empty.
+    """
+    candidates = {}
+    for candidate in _table_candidates(page) + _json_candidates(page):
+        known = candidates.setdefault(candidate["symbol"].upper(), candidate)
+        for key, value in candidate.items():
+            known[key] = known[key] or value
+    return list(candidates.values())
+
+
+def score_candidate(company_name, candidate):
+    exchange = EXCHANGE_SCORES.get(candidate["exchange"].lower(), UNKNOWN_EXCHANGE_SCORE)
+    quote_type = TYPE_SCORES.get(candidate["type"].lower().replace(" ", ""), 0.5)
+    return (
+        NAME_WEIGHT * name_similarity(company_name, candidate["name"])
+        + EXCHANGE_WEIGHT * exchange
+        + TYPE_WEIGHT * quote_type
+    )
+
+
+def rank_candidates(company_name, candidates):
+    """
+    Candidates sorted best first by name similarity, then exchange and
+    security type. Ties keep Yahoo's order.
+    """
+    return sorted(candidates, key=lambda candidate: -score_candidate(company_name, candidate))
+
+
+def best_symbol(company_name, page):
+    """
+    The most probable ticker for company_name on a lookup page, or None if
+    no listing's name is at least MIN_NAME_SIMILARITY similar to it. A
+    query that already is one of the listed symbols wins outright.
+    """
+    candidates = extract_candidates(page)
+    query = company_name.strip().upper()
+    for candidate in candidates:
+        if candidate["symbol"].upper() == query:
+            return candidate["symbol"]
+    candidates = [
+        candidate for candidate in candidates
+        if name_similarity(company_name, candidate["name"]) >= MIN_NAME_SIMILARITY
+    ]
+    return rank_candidates(company_name, candidates)[0]["symbol"] if candidates else None